@@ -0,0 +1,186 @@
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import torch
+
+# Add the parent directory to the path so we can import the backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.generate_synthetic_csi import generate_block, generate_sequence_block
+from backend.model import LSTM_Model
+
+
+def percentiles(timings_ms):
+    return {
+        'p50_ms': float(np.percentile(timings_ms, 50)),
+        'p95_ms': float(np.percentile(timings_ms, 95)),
+        'p99_ms': float(np.percentile(timings_ms, 99)),
+        'mean_ms': float(np.mean(timings_ms))
+    }
+
+
+def synthetic_csi(num_rows, seed=0):
+    # Time-coherent synthetic rows from the CSI generator
+    csi, _, _ = generate_sequence_block(num_rows, np.random.default_rng(seed))
+    return csi
+
+
+def bench_forward(model, batch_sizes, seq_lens, runs, warmup=10):
+    # Forward latency percentiles for every (batch_size, seq_len) pair
+    results = []
+    with torch.no_grad():
+        for seq_len in seq_lens:
+            for batch_size in batch_sizes:
+                x = torch.from_numpy(synthetic_csi(batch_size * seq_len)).view(batch_size, seq_len, -1)
+                timings = []
+                for i in range(warmup + runs):
+                    start = time.perf_counter()
+                    model(x)
+                    if i >= warmup:
+                        timings.append((time.perf_counter() - start) * 1000)
+                entry = {'batch_size': batch_size, 'seq_len': seq_len, **percentiles(timings)}
+                entry['windows_per_sec'] = batch_size / (entry['mean_ms'] / 1000)
+                results.append(entry)
+                print(f"forward batch={batch_size:<4} seq_len={seq_len:<5} "
+                      f"p50={entry['p50_ms']:.3f}ms p95={entry['p95_ms']:.3f}ms p99={entry['p99_ms']:.3f}ms")
+    return results
+
+
+def csv_bytes(num_rows):
+    csi, presence, pose = generate_block(num_rows, np.random.default_rng(0))
+    df = pd.DataFrame(csi, columns=[f'subcarrier_{i}' for i in range(csi.shape[1])])
+    df['presence'] = presence
+    df['pose'] = pose
+    return df.to_csv(index=False).encode()
+
+
+def bench_parse(server, row_counts, runs):
+    # Cost of server.process_csv on in-memory CSV uploads of increasing size
+    results = []
+    for num_rows in row_counts:
+        data = csv_bytes(num_rows)
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            server.process_csv(io.BytesIO(data))
+            timings.append((time.perf_counter() - start) * 1000)
+        entry = {'rows': num_rows, 'bytes': len(data), **percentiles(timings)}
+        entry['rows_per_sec'] = num_rows / (entry['mean_ms'] / 1000)
+        results.append(entry)
+        print(f"process_csv rows={num_rows:<8} p50={entry['p50_ms']:.3f}ms "
+              f"({entry['rows_per_sec']:.0f} rows/s)")
+    return results
+
+
+def bench_endpoint(server, concurrency_levels, requests_per_client, rows, cached=False):
+    # End-to-end /infer throughput through the Flask test client. Every
+    # request posts the same bytes, so the result cache is switched off unless
+    # cached=True, which measures cache hits after one warming request
+    data = csv_bytes(rows)
+    results = []
+    label = 'cached' if cached else 'uncached'
+    result_cache = server.result_cache
+    if not cached:
+        server.result_cache = None
+    elif result_cache is None:
+        return results
+    else:
+        server.app.test_client().post('/infer', data={'file': (io.BytesIO(data), 'bench.csv')},
+                                      content_type='multipart/form-data')
+
+    def client(_):
+        test_client = server.app.test_client()
+        timings = []
+        errors = 0
+        for _ in range(requests_per_client):
+            start = time.perf_counter()
+            response = test_client.post('/infer', data={'file': (io.BytesIO(data), 'bench.csv')},
+                                        content_type='multipart/form-data')
+            timings.append((time.perf_counter() - start) * 1000)
+            errors += response.status_code != 200
+        return timings, errors
+
+    try:
+        for clients in concurrency_levels:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=clients) as executor:
+                outcomes = list(executor.map(client, range(clients)))
+            elapsed = time.perf_counter() - start
+
+            timings = [t for client_timings, _ in outcomes for t in client_timings]
+            errors = sum(client_errors for _, client_errors in outcomes)
+            entry = {'clients': clients, 'rows': rows, 'requests': len(timings), 'errors': errors,
+                     'requests_per_sec': len(timings) / elapsed, **percentiles(timings)}
+            results.append(entry)
+            print(f"/infer ({label}) clients={clients:<3} {entry['requests_per_sec']:.1f} req/s "
+                  f"p50={entry['p50_ms']:.3f}ms p99={entry['p99_ms']:.3f}ms errors={errors}")
+    finally:
+        server.result_cache = result_cache
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark model and /infer latency and throughput")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32, 128])
+    parser.add_argument('--seq-lens', type=int, nargs='+', default=[1, 50, 200, 1000])
+    parser.add_argument('--parse-rows', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--requests-per-client', type=int, default=20)
+    parser.add_argument('--endpoint-rows', type=int, default=200)
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--skip', choices=['forward', 'parse', 'endpoint'], nargs='*', default=[])
+    parser.add_argument('--output', default='benchmark_results.json')
+    args = parser.parse_args()
+
+    # Importing the server loads the configured backend, so the forward pass
+    # is measured on whatever INFERENCE_BACKEND selects
+    from backend import server
+    model, _ = server.model_slot.get()
+    if model is None:
+        print("No trained model available, benchmarking randomly initialised weights")
+        from backend.inference_backends import EagerBackend
+        model = EagerBackend(LSTM_Model())
+        server.model_slot.swap(model, 'random-init')
+
+    results = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'backend': model.name,
+        'batching': server.scheduler is not None,
+        'torch_version': torch.__version__,
+        'torch_threads': torch.get_num_threads(),
+        'cpu_count': os.cpu_count(),
+        'platform': platform.platform()
+    }
+    if 'forward' not in args.skip:
+        results['forward'] = bench_forward(model, args.batch_sizes, args.seq_lens, args.runs)
+    if 'parse' not in args.skip:
+        results['parse'] = bench_parse(server, args.parse_rows, max(1, args.runs // 10))
+    if 'endpoint' not in args.skip:
+        results['endpoint'] = bench_endpoint(server, args.clients, args.requests_per_client, args.endpoint_rows)
+        results['endpoint_cached'] = bench_endpoint(server, args.clients, args.requests_per_client,
+                                                    args.endpoint_rows, cached=True)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nSaved benchmark results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
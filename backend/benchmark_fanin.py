@@ -0,0 +1,115 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+
+import numpy as np
+import torch
+
+# Add the parent directory to the path so we can import the backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.benchmark import git_commit
+from backend.model import LSTM_Model
+from backend.sensors import SensorHub
+
+POSE_CLASSES = ['Stand', 'Sit', 'Kneel', 'Sleep']
+
+
+def max_rss_mb():
+    # Peak resident set size of this process (ru_maxrss is in KiB on Linux)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def bench_sensors(model, num_sensors, window, frames_per_push, rounds, sensors_per_room):
+    # Each round every sensor pushes frames_per_push rows, then one batched
+    # step runs; compared with one forward per sensor over the same windows
+    hub = SensorHub(max_sensors=num_sensors, window=window)
+    rng = np.random.default_rng(0)
+    frames = rng.standard_normal((frames_per_push, 30)).astype(np.float32)
+
+    def predict(windows):
+        with torch.no_grad():
+            presence, logits = model(torch.from_numpy(windows))
+        return presence.numpy(), torch.softmax(logits, dim=1).numpy()
+
+    push_seconds = step_seconds = fuse_seconds = 0.0
+    rss_start = None
+    for i in range(rounds):
+        start = time.perf_counter()
+        for sensor in range(num_sensors):
+            hub.push(f'sensor-{sensor}', f'room-{sensor // sensors_per_room}', frames)
+        push_time = time.perf_counter() - start
+        start = time.perf_counter()
+        hub.step(predict)
+        step_time = time.perf_counter() - start
+        start = time.perf_counter()
+        rooms = hub.rooms_result(POSE_CLASSES)
+        fuse_time = time.perf_counter() - start
+        # The first rounds fill the rings and warm up the model
+        if i >= rounds // 2:
+            push_seconds += push_time
+            step_seconds += step_time
+            fuse_seconds += fuse_time
+            if rss_start is None:
+                rss_start = max_rss_mb()
+    timed = rounds - rounds // 2
+
+    windows = torch.randn(num_sensors, window, 30)
+    start = time.perf_counter()
+    with torch.no_grad():
+        for sensor in range(num_sensors):
+            model(windows[sensor:sensor + 1])
+    sequential_seconds = time.perf_counter() - start
+
+    return {
+        'sensors': num_sensors,
+        'rooms': len(rooms),
+        'push_us_per_sensor': push_seconds / timed / num_sensors * 1e6,
+        'step_ms': step_seconds / timed * 1000,
+        'fuse_ms': fuse_seconds / timed * 1000,
+        'sequential_forward_ms': sequential_seconds * 1000,
+        'buffer_mb': hub.buffer.nbytes / 1e6,
+        'rss_growth_mb': max_rss_mb() - rss_start
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark multi-sensor fan-in: batched step latency and memory")
+    parser.add_argument('--sensors', type=int, nargs='+', default=[16, 64, 256, 512])
+    parser.add_argument('--window', type=int, default=50)
+    parser.add_argument('--frames-per-push', type=int, default=10)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--sensors-per-room', type=int, default=16)
+    parser.add_argument('--output', default='fanin_results.json')
+    args = parser.parse_args()
+
+    model = LSTM_Model().eval()
+    results = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'torch_version': torch.__version__,
+        'torch_threads': torch.get_num_threads(),
+        'platform': platform.platform(),
+        'window': args.window,
+        'frames_per_push': args.frames_per_push,
+        'runs': []
+    }
+    for num_sensors in args.sensors:
+        entry = bench_sensors(model, num_sensors, args.window, args.frames_per_push,
+                              args.rounds, args.sensors_per_room)
+        results['runs'].append(entry)
+        print(f"sensors={num_sensors:<5} step={entry['step_ms']:.1f}ms "
+              f"(one forward per sensor {entry['sequential_forward_ms']:.1f}ms) "
+              f"push={entry['push_us_per_sensor']:.1f}us/sensor fuse={entry['fuse_ms']:.2f}ms "
+              f"buffer={entry['buffer_mb']:.1f}MB rss growth={entry['rss_growth_mb']:.1f}MB")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nSaved fan-in results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+# Add the parent directory to the path so we can import the backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.benchmark import git_commit
+from backend.generate_synthetic_csi import generate_sequence_block
+from backend.preprocessing import Preprocessor, PreprocessState
+
+# Stage configurations timed on their own and together
+STAGES = {
+    'normalize': {'hampel_window': 0, 'filter_cutoff': None},
+    'hampel': {'hampel_window': 5, 'filter_cutoff': None},
+    'iir': {'hampel_window': 0, 'filter_cutoff': 0.25},
+    'full': {'hampel_window': 5, 'filter_cutoff': 0.25}
+}
+
+
+def make_recording(num_rows, outlier_rate=0.001, seed=0):
+    # Synthetic time-coherent CSI with isolated spikes for the Hampel filter
+    rng = np.random.default_rng(seed)
+    csi = generate_sequence_block(num_rows, rng)[0].astype(np.float32)
+    spikes = rng.random(csi.shape) < outlier_rate
+    csi[spikes] += rng.choice([-10, 10], size=int(spikes.sum()))
+    return csi
+
+
+def time_rows_per_sec(fn, num_rows, repeats):
+    # Best of repeats, so the figure reflects the code rather than noise
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return num_rows / best, best
+
+
+def bench_stages(csi, repeats):
+    results = {}
+    for name, settings in STAGES.items():
+        preprocessor = Preprocessor(**settings).fit(csi[:100_000])
+        rows_per_sec, seconds = time_rows_per_sec(lambda: preprocessor(csi), len(csi), repeats)
+        results[name] = {'rows_per_sec': rows_per_sec, 'seconds': seconds}
+        print(f"{name:<10} {rows_per_sec / 1e6:>7.2f} M rows/s  ({seconds * 1000:.1f} ms for {len(csi)} rows)")
+    return results
+
+
+def bench_chunked(csi, chunk_sizes, repeats):
+    # Streaming use: the same recording pushed in chunks with carried state.
+    # The output must match the whole-array result exactly
+    preprocessor = Preprocessor().fit(csi[:100_000])
+    reference = preprocessor(csi)
+    results = []
+    for chunk_rows in chunk_sizes:
+        def run():
+            state = PreprocessState()
+            return [preprocessor(csi[start:start + chunk_rows], state)
+                    for start in range(0, len(csi), chunk_rows)]
+        rows_per_sec, seconds = time_rows_per_sec(run, len(csi), repeats)
+        max_diff = float(np.abs(np.concatenate(run()) - reference).max())
+        results.append({'chunk_rows': chunk_rows, 'rows_per_sec': rows_per_sec, 'max_abs_diff': max_diff})
+        print(f"chunk={chunk_rows:<7} {rows_per_sec / 1e6:>7.2f} M rows/s  max diff vs whole array {max_diff:.1e}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CSI preprocessing throughput")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--chunk-rows', type=int, nargs='+', default=[256, 4096, 65536],
+                        help="Streaming chunk sizes to time")
+    parser.add_argument('--target', type=float, default=1_000_000, help="Full pipeline rows/s target")
+    parser.add_argument('--output', default='preprocessing_results.json')
+    args = parser.parse_args()
+
+    csi = make_recording(args.rows)
+    print(f"Preprocessing {args.rows} x {csi.shape[1]} float32 rows")
+    stages = bench_stages(csi, args.repeats)
+    print()
+    chunked = bench_chunked(csi, args.chunk_rows, args.repeats)
+
+    full = stages['full']['rows_per_sec']
+    meets_target = full >= args.target
+    print(f"\nFull pipeline: {full:.0f} rows/s, target {args.target:.0f}: {'met' if meets_target else 'missed'}")
+
+    results = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'numpy_version': np.__version__,
+        'cpu_count': os.cpu_count(),
+        'platform': platform.platform(),
+        'rows': args.rows,
+        'stages': stages,
+        'chunked': chunked,
+        'target_rows_per_sec': args.target,
+        'meets_target': meets_target
+    }
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved preprocessing results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import torch
+
+# Add the parent directory to the path so we can import the backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.benchmark import git_commit
+from backend.generate_synthetic_csi import NUM_SUBCARRIERS, generate_sequence_block
+from backend.train_lstm_pose import train_model
+
+
+def write_dataset(path, num_rows, seed=0):
+    # Time-coherent synthetic recording in the dataset.csv layout
+    csi, presence, pose = generate_sequence_block(num_rows, np.random.default_rng(seed))
+    df = pd.DataFrame(csi, columns=[f'subcarrier_{i}' for i in range(NUM_SUBCARRIERS)])
+    df['presence'] = presence
+    df['pose'] = pose
+    df.to_csv(path, index=False)
+
+
+def bench_scaling(dataset_path, process_counts, epochs, seq_len, batch_size, fast):
+    # Epoch time of data-parallel training for each process count. The first
+    # epoch includes process start-up and is only counted if it is the only one
+    results = []
+    baseline = None
+    for processes in process_counts:
+        history = train_model(dataset_path, seq_len=seq_len, fast=fast, batch_size=batch_size,
+                              num_epochs=epochs, num_processes=processes,
+                              model_path=None, plot_path=None)
+        timed = history['epoch_seconds'][1:] or history['epoch_seconds']
+        epoch_seconds = float(np.mean(timed))
+        if processes == 1:
+            baseline = epoch_seconds
+        entry = {
+            'processes': processes,
+            'threads_per_process': max(1, (os.cpu_count() or 1) // processes),
+            'epoch_seconds': epoch_seconds,
+            'samples_per_sec': float(np.mean(history['throughput'][1:] or history['throughput'])),
+            'final_val_loss': history['val_losses'][-1]
+        }
+        if baseline is not None:
+            entry['speedup'] = baseline / epoch_seconds
+        results.append(entry)
+        print(f"processes={processes:<3} epoch={epoch_seconds:.3f}s "
+              f"{entry['samples_per_sec']:.0f} samples/s"
+              + (f" speedup={entry['speedup']:.2f}x" if 'speedup' in entry else ''))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark data-parallel CPU training scaling")
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--data', default=None,
+                        help="Training CSV; defaults to a synthetic recording of --rows rows")
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--epochs', type=int, default=3)
+    parser.add_argument('--seq-len', type=int, default=50)
+    parser.add_argument('--batch-size', type=int, default=None, help="Per process")
+    parser.add_argument('--no-fast', action='store_true', help="Use DataLoader batches instead")
+    parser.add_argument('--output', default='training_scaling_results.json')
+    args = parser.parse_args()
+
+    results = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'torch_version': torch.__version__,
+        'cpu_count': os.cpu_count(),
+        'platform': platform.platform(),
+        'seq_len': args.seq_len,
+        'epochs': args.epochs
+    }
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        dataset_path = args.data
+        if dataset_path is None:
+            dataset_path = os.path.join(tmp_dir, 'dataset.csv')
+            write_dataset(dataset_path, args.rows)
+        results['dataset'] = args.data or f'synthetic ({args.rows} rows)'
+        results['scaling'] = bench_scaling(dataset_path, args.processes, args.epochs, args.seq_len,
+                                           args.batch_size, not args.no_fast)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nSaved training scaling results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
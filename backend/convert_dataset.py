@@ -0,0 +1,143 @@
+import argparse
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Output layout, shared with train_lstm_pose.WindowedCSIDataset and CSIDataset:
+#   <prefix>_csi.npy       [rows, subcarriers] float32
+#   <prefix>_presence.npy  [rows] float32
+#   <prefix>_pose.npy      [rows] int64
+READ_BLOCK = 64 * 1024 * 1024
+ARRAY_NAMES = ('csi', 'presence', 'pose')
+
+
+def is_converted(csv_file, prefix):
+    # True if every array exists and none is older than the CSV, so a
+    # regenerated CSV is converted again
+    paths = [f"{prefix}_{name}.npy" for name in ARRAY_NAMES]
+    if not all(os.path.exists(path) for path in paths):
+        return False
+    return min(os.path.getmtime(path) for path in paths) >= os.path.getmtime(csv_file)
+
+
+def split_ranges(path, chunk_bytes):
+    # Byte ranges of roughly chunk_bytes covering the rows after the header,
+    # each ending just after a newline so no row is split
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        f.readline()
+        start = f.tell()
+        ranges = []
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            if f.tell() < size:
+                f.readline()
+            end = f.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def count_rows(args):
+    # Newlines in a byte range, plus a final row without a trailing newline
+    path, start, end = args
+    rows = 0
+    last = b''
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(READ_BLOCK, remaining))
+            rows += block.count(b'\n')
+            remaining -= len(block)
+            last = block[-1:]
+    return rows + (last not in (b'', b'\n'))
+
+
+def convert_range(args):
+    # Parse one byte range and write it into the output arrays at its row offset
+    path, start, end, row_offset, out_prefix, num_columns = args
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    values = pd.read_csv(io.BytesIO(data), header=None, dtype=np.float32,
+                         names=range(num_columns), engine='c').to_numpy()
+
+    rows = len(values)
+    csi = np.load(f"{out_prefix}_csi.npy", mmap_mode='r+')
+    presence = np.load(f"{out_prefix}_presence.npy", mmap_mode='r+')
+    pose = np.load(f"{out_prefix}_pose.npy", mmap_mode='r+')
+    csi[row_offset:row_offset + rows] = values[:, :-2]
+    presence[row_offset:row_offset + rows] = values[:, -2]
+    pose[row_offset:row_offset + rows] = values[:, -1]
+    for array in (csi, presence, pose):
+        array.flush()
+    return rows
+
+
+def convert_csv_parallel(csv_file, prefix=None, workers=None, chunk_bytes=64 * 1024 * 1024):
+    # Convert a CSV dataset into the .npy layout using a process pool: rows are
+    # counted per byte range first, so every range knows where its rows go,
+    # then the ranges are parsed and written concurrently. The arrays are
+    # written under temporary names and renamed into place once complete, so
+    # an interrupted conversion never leaves partial files at the final names
+    prefix = prefix or os.path.splitext(csv_file)[0]
+    tmp_prefix = f"{prefix}.{os.getpid()}.tmp"
+    num_columns = len(pd.read_csv(csv_file, nrows=0).columns)
+    ranges = split_ranges(csv_file, chunk_bytes)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        counts = list(executor.map(count_rows, [(csv_file, start, end) for start, end in ranges]))
+        offsets = np.concatenate([[0], np.cumsum(counts)]).tolist()
+        num_rows = offsets[-1]
+
+        try:
+            csi = np.lib.format.open_memmap(f"{tmp_prefix}_csi.npy", mode='w+', dtype=np.float32,
+                                            shape=(num_rows, num_columns - 2))
+            presence = np.lib.format.open_memmap(f"{tmp_prefix}_presence.npy", mode='w+', dtype=np.float32,
+                                                 shape=(num_rows,))
+            pose = np.lib.format.open_memmap(f"{tmp_prefix}_pose.npy", mode='w+', dtype=np.int64,
+                                             shape=(num_rows,))
+            del csi, presence, pose
+
+            tasks = [(csv_file, start, end, offsets[i], tmp_prefix, num_columns)
+                     for i, (start, end) in enumerate(ranges)]
+            written = sum(executor.map(convert_range, tasks))
+            if written != num_rows:
+                raise ValueError(f"Expected {num_rows} rows but parsed {written}")
+        except BaseException:
+            for name in ARRAY_NAMES:
+                if os.path.exists(f"{tmp_prefix}_{name}.npy"):
+                    os.remove(f"{tmp_prefix}_{name}.npy")
+            raise
+
+    # csi last: its presence is what marks a prefix as converted
+    for name in ('pose', 'presence', 'csi'):
+        os.replace(f"{tmp_prefix}_{name}.npy", f"{prefix}_{name}.npy")
+    return prefix, num_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a CSI CSV dataset to memory-mappable .npy files")
+    parser.add_argument('csv_file')
+    parser.add_argument('--output', default=None, help="Output prefix (default: the CSV path without .csv)")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-mb', type=int, default=64, help="CSV bytes parsed per task")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    prefix, num_rows = convert_csv_parallel(args.csv_file, args.output, args.workers,
+                                            args.chunk_mb * 1024 * 1024)
+    elapsed = time.perf_counter() - start
+    csv_mb = os.path.getsize(args.csv_file) / 1e6
+    npy_mb = sum(os.path.getsize(f"{prefix}_{name}.npy") for name in ARRAY_NAMES) / 1e6
+    print(f"Converted {num_rows} rows from {args.csv_file} to {prefix}_*.npy in {elapsed:.2f}s "
+          f"({num_rows / max(elapsed, 1e-9):.0f} rows/s, {csv_mb:.1f} MB CSV -> {npy_mb:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
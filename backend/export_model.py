@@ -0,0 +1,68 @@
+import argparse
+import os
+import sys
+
+import torch
+
+# Add the parent directory to the path so we can import the backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.model import load_state_dict, model_from_state_dict
+from backend.inference_backends import EagerBackend, TorchScriptBackend, OnnxBackend, verify_backend
+
+
+def load_checkpoint(path):
+    # Either architecture at any size, from a state dict or a training checkpoint
+    return model_from_state_dict(load_state_dict(path))
+
+
+def export_torchscript(model, path):
+    # Scripting (not tracing) keeps batch and sequence length dynamic
+    scripted = torch.jit.script(model)
+    scripted.save(path)
+    print(f"Saved TorchScript model to {path}")
+
+
+def export_onnx(model, path, opset=17):
+    dummy = torch.randn(2, 50, model.input_size)
+    torch.onnx.export(
+        model, dummy, path,
+        input_names=['csi'],
+        output_names=['presence', 'pose_logits'],
+        dynamic_axes={
+            'csi': {0: 'batch', 1: 'seq_len'},
+            'presence': {0: 'batch'},
+            'pose_logits': {0: 'batch'}
+        },
+        opset_version=opset
+    )
+    print(f"Saved ONNX model to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the pose model for optimized CPU serving")
+    parser.add_argument('--checkpoint', default='pose_detection_model.pth')
+    parser.add_argument('--format', choices=['torchscript', 'onnx', 'all'], default='all')
+    parser.add_argument('--output-dir', default='.')
+    parser.add_argument('--atol', type=float, default=1e-4,
+                        help="Maximum allowed difference from the eager model")
+    args = parser.parse_args()
+    
+    model = load_checkpoint(args.checkpoint)
+    reference = EagerBackend(model)
+    base = os.path.splitext(os.path.basename(args.checkpoint))[0]
+    
+    if args.format in ('torchscript', 'all'):
+        path = os.path.join(args.output_dir, base + '.ts')
+        export_torchscript(model, path)
+        diff = verify_backend(TorchScriptBackend(path), reference, model.input_size, atol=args.atol)
+        print(f"TorchScript matches eager model (max abs diff {diff:.2e})")
+    
+    if args.format in ('onnx', 'all'):
+        path = os.path.join(args.output_dir, base + '.onnx')
+        export_onnx(model, path)
+        diff = verify_backend(OnnxBackend(path), reference, model.input_size, atol=args.atol)
+        print(f"ONNX Runtime matches eager model (max abs diff {diff:.2e})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,95 +1,146 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
 import pandas as pd
-from scipy.signal import butter, filtfilt
-import random
-
-def generate_synthetic_csi(num_samples=1000):
-    # Parameters
-    num_subcarriers = 30  # Number of CSI subcarriers
-    noise_level = 0.1    # Amount of noise to add
-    
-    # Lists to store all data
-    all_csi_data = []
-    all_presence = []
-    all_poses = []
-    
-    # Define pose-specific CSI patterns
-    def generate_pose_pattern(pose, presence):
-        if not presence:
-            # Generate background noise when no human is present
-            return np.random.normal(0, 0.1, num_subcarriers)
-        
-        # Base pattern
-        x = np.linspace(0, 2*np.pi, num_subcarriers)
-        
-        if pose == 0:  # Standing
-            pattern = 2.0 * np.sin(x) + 0.5 * np.cos(2*x)
-        elif pose == 1:  # Sitting
-            pattern = 1.5 * np.sin(x + np.pi/4) + 0.8 * np.cos(3*x)
-        elif pose == 2:  # Kneeling
-            pattern = 1.2 * np.sin(2*x) + 0.6 * np.cos(x + np.pi/3)
-        else:  # Sleeping
-            pattern = 0.8 * np.sin(3*x) + 1.0 * np.cos(x + np.pi/6)
-        
-        # Add random variations
-        pattern += np.random.normal(0, noise_level, num_subcarriers)
-        
-        return pattern
-    
-    # Generate samples for each pose
-    for _ in range(num_samples):
-        # Randomly decide presence (70% chance of human present)
-        presence = random.random() < 0.7
-        
-        if presence:
-            # Generate pose only if human is present
-            pose = random.randint(0, 3)  # 0:Stand, 1:Sit, 2:Kneel, 3:Sleep
-        else:
-            pose = 0  # Default pose when no human present
-        
-        # Generate CSI pattern
-        csi_pattern = generate_pose_pattern(pose, presence)
-        
-        # Apply butterworth filter to smooth the pattern
-        b, a = butter(3, 0.1)
-        csi_pattern = filtfilt(b, a, csi_pattern)
-        
-        # Store the data
-        all_csi_data.append(csi_pattern)
-        all_presence.append(int(presence))
-        all_poses.append(pose)
-    
-    # Convert to numpy arrays
-    all_csi_data = np.array(all_csi_data)
-    all_presence = np.array(all_presence)
-    all_poses = np.array(all_poses)
-    
+from scipy.signal import butter, filtfilt, lfilter
+
+# Parameters
+NUM_SUBCARRIERS = 30  # Number of CSI subcarriers
+NOISE_LEVEL = 0.1  # Amount of noise to add
+PRESENCE_PROBABILITY = 0.7  # Chance of a human being present
+
+# Butterworth filter used to smooth each pattern across subcarriers, designed once
+FILTER_B, FILTER_A = butter(3, 0.1)
+
+def pose_patterns(num_subcarriers=NUM_SUBCARRIERS):
+    # Base CSI pattern for each pose as a [4, num_subcarriers] table
+    x = np.linspace(0, 2*np.pi, num_subcarriers)
+    return np.stack([
+        2.0 * np.sin(x) + 0.5 * np.cos(2*x),                # Standing
+        1.5 * np.sin(x + np.pi/4) + 0.8 * np.cos(3*x),      # Sitting
+        1.2 * np.sin(2*x) + 0.6 * np.cos(x + np.pi/3),      # Kneeling
+        0.8 * np.sin(3*x) + 1.0 * np.cos(x + np.pi/6)       # Sleeping
+    ])
+
+PATTERNS = pose_patterns()
+
+def render_csi(presence, pose, rng):
+    # Build CSI rows for given labels: the pose pattern plus noise when a human
+    # is present, background noise otherwise, then smoothed across subcarriers
+    num_samples = len(presence)
+    noise = rng.normal(0, NOISE_LEVEL, (num_samples, NUM_SUBCARRIERS))
+    csi = np.where(presence[:, None], PATTERNS[pose] + noise, noise)
+    return filtfilt(FILTER_B, FILTER_A, csi, axis=1).astype(np.float32)
+
+def generate_block(num_samples, rng):
+    # Independent rows: (csi [n, 30] float32, presence [n] int64, pose [n] int64)
+    presence = rng.random(num_samples) < PRESENCE_PROBABILITY
+    # Pose 0:Stand, 1:Sit, 2:Kneel, 3:Sleep; default pose 0 when no human is present
+    pose = np.where(presence, rng.integers(0, 4, num_samples), 0)
+    return render_csi(presence, pose, rng), presence.astype(np.int64), pose.astype(np.int64)
+
+def generate_sequence_block(num_samples, rng, min_segment=50, max_segment=500, transition=0.9):
+    # Time-coherent rows: the recording is a chain of segments, each holding one
+    # presence/pose state for min_segment..max_segment rows. A one-pole low-pass
+    # along time blends the patterns at transitions instead of switching abruptly
+    num_segments = num_samples // min_segment + 1
+    lengths = rng.integers(min_segment, max_segment + 1, num_segments)
+    segment_presence = rng.random(num_segments) < PRESENCE_PROBABILITY
+    segment_pose = np.where(segment_presence, rng.integers(0, 4, num_segments), 0)
+
+    presence = np.repeat(segment_presence, lengths)[:num_samples]
+    pose = np.repeat(segment_pose, lengths)[:num_samples]
+
+    target = np.where(presence[:, None], PATTERNS[pose], 0.0)
+    target = lfilter([1 - transition], [1, -transition], target, axis=0,
+                     zi=target[:1] * transition)[0]
+    noise = rng.normal(0, NOISE_LEVEL, target.shape)
+    csi = filtfilt(FILTER_B, FILTER_A, target + noise, axis=1).astype(np.float32)
+    return csi, presence.astype(np.int64), pose.astype(np.int64)
+
+def write_shard(args):
+    # Generate one chunk with its own seed and write it as <prefix>_*.npy files,
+    # the layout read by train_lstm_pose.WindowedCSIDataset
+    out_dir, index, num_samples, seed_sequence, sequences = args
+    rng = np.random.default_rng(seed_sequence)
+    block = generate_sequence_block if sequences else generate_block
+    csi, presence, pose = block(num_samples, rng)
+
+    prefix = os.path.join(out_dir, f"shard_{index:05d}")
+    np.save(f"{prefix}_csi.npy", csi)
+    np.save(f"{prefix}_presence.npy", presence.astype(np.float32))
+    np.save(f"{prefix}_pose.npy", pose)
+    return prefix, num_samples, int(presence.sum())
+
+def generate_sharded_csi(num_samples, out_dir, chunk_size=1_000_000, workers=None, seed=42, sequences=False):
+    # Generate a large dataset across processes. Chunk seeds are spawned from a
+    # single SeedSequence, so the output is the same for any number of workers
+    os.makedirs(out_dir, exist_ok=True)
+    num_chunks = -(-num_samples // chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(num_chunks)
+    tasks = [(out_dir, i, min(chunk_size, num_samples - i * chunk_size), seeds[i], sequences)
+             for i in range(num_chunks)]
+
+    total_present = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for prefix, count, present in executor.map(write_shard, tasks):
+            total_present += present
+            print(f"Wrote {count} samples to {prefix}_*.npy")
+
+    print(f"Generated {num_samples} synthetic CSI samples in {num_chunks} shards under {out_dir}")
+    print(f"Samples with human present: {total_present}")
+
+def generate_synthetic_csi(num_samples=1000, seed=42, sequences=False):
+    rng = np.random.default_rng(seed)
+    block = generate_sequence_block if sequences else generate_block
+    all_csi_data, all_presence, all_poses = block(num_samples, rng)
+
     # Create DataFrame
-    csi_columns = [f'subcarrier_{i}' for i in range(num_subcarriers)]
+    csi_columns = [f'subcarrier_{i}' for i in range(NUM_SUBCARRIERS)]
     df = pd.DataFrame(all_csi_data, columns=csi_columns)
-    
+
     # Add presence and pose columns
     df['presence'] = all_presence
     df['pose'] = all_poses
-    
-    # Shuffle the dataset to avoid sequential patterns
-    df = df.sample(frac=1, random_state=42).reset_index(drop=True)
-    
+
+    if not sequences:
+        # Shuffle the dataset to avoid sequential patterns
+        df = df.sample(frac=1, random_state=42).reset_index(drop=True)
+
     # Save to CSV
     df.to_csv('dataset.csv', index=False)
     print(f"Generated {num_samples} synthetic CSI samples and saved to dataset.csv")
-    print(f"Dataset has been shuffled to avoid sequential patterns")
-    
+    if sequences:
+        print("Dataset is a time-coherent sequence with pose transitions")
+    else:
+        print(f"Dataset has been shuffled to avoid sequential patterns")
+
     # Print some statistics
     print("\nDataset Statistics:")
     print(f"Total samples: {num_samples}")
-    print(f"Samples with human present: {sum(all_presence)}")
+    print(f"Samples with human present: {all_presence.sum()}")
     print("\nPose distribution (when human present):")
     present_poses = all_poses[all_presence == 1]
     for pose_id in range(4):
-        count = sum(present_poses == pose_id)
-        print(f"Pose {pose_id}: {count} samples ({100 * count / len(present_poses):.1f}%)")
+        count = (present_poses == pose_id).sum()
+        print(f"Pose {pose_id}: {count} samples ({100 * count / max(len(present_poses), 1):.1f}%)")
 
 if __name__ == "__main__":
-    generate_synthetic_csi(num_samples=1000)
+    parser = argparse.ArgumentParser(description="Generate synthetic CSI data")
+    parser.add_argument('--num-samples', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--sequences', action='store_true',
+                        help="Generate time-coherent sequences with pose transitions")
+    parser.add_argument('--shards-dir', default=None,
+                        help="Write sharded .npy files here instead of dataset.csv")
+    parser.add_argument('--chunk-size', type=int, default=1_000_000)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.shards_dir:
+        generate_sharded_csi(args.num_samples, args.shards_dir, args.chunk_size,
+                             args.workers, args.seed, args.sequences)
+    else:
+        generate_synthetic_csi(args.num_samples, args.seed, args.sequences)
@@ -0,0 +1,110 @@
+import torch
+
+
+class InferenceBackend:
+    # Common interface: backend(x) -> (presence [batch], pose_logits [batch, classes])
+    # for x shaped [seq_len, features] or [batch, seq_len, features]
+    name = 'base'
+    # Optional backend.preprocessing.Preprocessor the model was trained with;
+    # the server applies it to raw CSI before calling the backend
+    preprocessor = None
+
+    def __call__(self, x):
+        raise NotImplementedError
+
+    def share_memory(self):
+        # Move weights to shared memory before forking workers; no-op by default
+        pass
+
+    def forward_packed(self, x, lengths):
+        # Fallback for backends without packed-sequence support: run groups of
+        # equal length as batches, trimmed to their true length
+        lengths = lengths.tolist()
+        presence = torch.empty(len(lengths))
+        pose_logits = None
+        for length in sorted(set(lengths)):
+            idx = [i for i, l in enumerate(lengths) if l == length]
+            group_presence, group_pose = self(x[idx, :length].contiguous())
+            if pose_logits is None:
+                pose_logits = torch.empty(len(lengths), group_pose.size(1))
+            presence[idx] = group_presence
+            pose_logits[idx] = group_pose
+        return presence, pose_logits
+
+
+class EagerBackend(InferenceBackend):
+    name = 'eager'
+
+    def __init__(self, model, name='eager'):
+        self.model = model.eval()
+        self.name = name
+
+    def __call__(self, x):
+        return self.model(x)
+
+    def forward_packed(self, x, lengths):
+        return self.model.forward_packed(x, lengths)
+
+    def forward_stateful(self, x, state=None):
+        return self.model.forward_stateful(x, state)
+
+    def share_memory(self):
+        self.model.share_memory()
+
+
+class TorchScriptBackend(InferenceBackend):
+    name = 'torchscript'
+
+    def __init__(self, path):
+        # Freezing inlines the weights as constants so the optimizer can fold them
+        scripted = torch.jit.load(path, map_location=torch.device('cpu')).eval()
+        self.module = torch.jit.optimize_for_inference(torch.jit.freeze(scripted))
+
+    def __call__(self, x):
+        return self.module(x)
+
+    def share_memory(self):
+        self.module.share_memory()
+
+
+class OnnxBackend(InferenceBackend):
+    name = 'onnx'
+
+    def __init__(self, path, num_threads=None):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise RuntimeError("onnxruntime is required for the 'onnx' inference backend")
+        
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, x):
+        if x.dim() == 2:
+            x = x.unsqueeze(0)
+        inputs = {self.input_name: x.detach().cpu().contiguous().numpy()}
+        presence, pose_logits = self.session.run(None, inputs)
+        return torch.from_numpy(presence), torch.from_numpy(pose_logits)
+
+
+def verify_backend(backend, reference, input_size=30, shapes=((1, 1), (1, 50), (8, 50), (3, 200)), atol=1e-4):
+    # Compare a backend against the eager reference model on random inputs.
+    # Returns the largest absolute difference seen; raises if it exceeds atol
+    torch.manual_seed(0)
+    max_diff = 0.0
+    with torch.no_grad():
+        for batch_size, seq_len in shapes:
+            x = torch.randn(batch_size, seq_len, input_size)
+            ref_presence, ref_pose = reference(x)
+            presence, pose_logits = backend(x)
+            diff = max((presence - ref_presence).abs().max().item(),
+                       (pose_logits - ref_pose).abs().max().item())
+            max_diff = max(max_diff, diff)
+    
+    if max_diff > atol:
+        raise AssertionError(f"{backend.name} backend differs from eager model by {max_diff:.2e} (atol {atol:.0e})")
+    return max_diff
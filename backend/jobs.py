@@ -0,0 +1,293 @@
+import json
+import os
+import queue
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+# Job store layout, shared by every server process on the host:
+#   <store>/<job id>/status.json    status, progress, summary and timestamps
+#   <store>/<job id>/results.jsonl  result rows, one JSON object per line
+#   <store>/<job id>/payload        the spooled upload, removed when the job ends
+#   <store>/<job id>/CANCEL         written by whichever process cancels the job
+#   <store>/<job id>/REMOVED        the job was deleted; hidden from readers
+#   <store>/.upload-*               uploads being spooled, not yet submitted
+STATUS_NAME = 'status.json'
+RESULTS_NAME = 'results.jsonl'
+PAYLOAD_NAME = 'payload'
+CANCEL_NAME = 'CANCEL'
+REMOVED_NAME = 'REMOVED'
+SPOOL_PREFIX = '.upload-'
+FINAL_STATUSES = ('completed', 'failed', 'cancelled')
+JOB_ID = re.compile(r'[0-9a-f]{32}')
+
+
+class QueueFull(Exception):
+    pass
+
+
+def read_status(job_dir):
+    # A job directory's status, or None if it is missing or being removed
+    try:
+        with open(os.path.join(job_dir, STATUS_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class Job:
+    # Worker side of one background analysis. Every change is written
+    # through to the job's directory, so the process that runs the job does
+    # not have to be the one that answers status and result requests
+    def __init__(self, store_dir):
+        self.id = uuid.uuid4().hex
+        self.dir = os.path.join(store_dir, self.id)
+        self.status = 'queued'
+        self.progress = 0.0
+        self.num_results = 0
+        self.summary = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        os.makedirs(self.dir)
+        open(os.path.join(self.dir, RESULTS_NAME), 'w').close()
+        self._write_status()
+
+    @property
+    def payload_path(self):
+        return os.path.join(self.dir, PAYLOAD_NAME)
+
+    @property
+    def done(self):
+        return self.status in FINAL_STATUSES
+
+    @property
+    def cancelled(self):
+        # Set by a DELETE in any process
+        return os.path.exists(os.path.join(self.dir, CANCEL_NAME))
+
+    def start(self):
+        self.status = 'running'
+        self.started_at = time.time()
+        self._write_status()
+
+    def append(self, rows, progress):
+        # Rows are written before the status that counts them, so readers
+        # never see a row count ahead of the file
+        if rows:
+            with open(os.path.join(self.dir, RESULTS_NAME), 'a') as f:
+                f.write(''.join(json.dumps(row) + '\n' for row in rows))
+        self.num_results += len(rows)
+        self.progress = progress
+        self._write_status()
+
+    def finish(self, summary=None):
+        if self.cancelled:
+            self._end('cancelled')
+        else:
+            self._end('completed', summary=summary, progress=1.0)
+
+    def fail(self, error):
+        self._end('failed', error=error)
+
+    def _end(self, status, summary=None, error=None, progress=None):
+        self.status = status
+        self.summary = summary
+        self.error = error
+        if progress is not None:
+            self.progress = progress
+        self.finished_at = time.time()
+        if os.path.exists(os.path.join(self.dir, REMOVED_NAME)):
+            shutil.rmtree(self.dir, ignore_errors=True)
+            return
+        self._write_status()
+        if os.path.exists(self.payload_path):
+            os.remove(self.payload_path)
+
+    def _write_status(self):
+        # Replaced atomically so readers never see partial JSON
+        path = os.path.join(self.dir, STATUS_NAME)
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump({
+                'job_id': self.id,
+                'status': self.status,
+                'progress': self.progress,
+                'num_results': self.num_results,
+                'summary': self.summary,
+                'error': self.error,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at
+            }, f)
+        os.replace(f"{path}.tmp", path)
+
+
+class StoredJob:
+    # Reader side of a job, from its directory; works in any server process
+    def __init__(self, job_dir, status):
+        self.dir = job_dir
+        self.id = status['job_id']
+        self.status = status['status']
+
+    def read_status(self):
+        # The latest status, or None once the job has been removed
+        return read_status(self.dir)
+
+    def snapshot(self, since=0):
+        # Status plus the result rows from index `since` on, so pollers only
+        # fetch what is new
+        status = self.read_status()
+        if status is None:
+            return None
+        with open(os.path.join(self.dir, RESULTS_NAME)) as f:
+            lines = [line for i, line in zip(range(status['num_results']), f) if i >= since]
+        return dict(status, results=[json.loads(line) for line in lines])
+
+    def follow(self, poll_seconds=0.5):
+        # Yield result rows as they are written until the job ends
+        sent = 0
+        with open(os.path.join(self.dir, RESULTS_NAME)) as f:
+            while True:
+                status = self.read_status()
+                if status is None:
+                    return
+                while sent < status['num_results']:
+                    yield json.loads(f.readline())
+                    sent += 1
+                if status['status'] in FINAL_STATUSES:
+                    return
+                time.sleep(poll_seconds)
+
+    def cancel(self):
+        # Queued jobs are skipped; running ones stop after their current chunk
+        open(os.path.join(self.dir, CANCEL_NAME), 'w').close()
+
+
+class JobQueue:
+    """Bounded pool of background workers for long-running analyses.
+
+    Job state, results and uploads live under store_dir, so with several
+    server processes any of them can report on or cancel a job that another
+    one runs. Each process has its own workers; at most max_pending jobs
+    wait in its queue and submit() raises QueueFull beyond that so callers
+    can push back on clients. Finished jobs are kept for ttl seconds so
+    their results can still be fetched.
+    """
+
+    def __init__(self, store_dir, workers=2, max_pending=8, ttl=3600):
+        self.store_dir = store_dir
+        self.workers = workers
+        self.ttl = ttl
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._threads = []
+        os.makedirs(store_dir, exist_ok=True)
+
+    def spool(self, stream):
+        # Copy an upload stream to a file in the store without holding it in
+        # memory. The path is handed to submit(); the caller removes it if
+        # the job is never submitted
+        fd, path = tempfile.mkstemp(dir=self.store_dir, prefix=SPOOL_PREFIX)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                shutil.copyfileobj(stream, f, 1 << 20)
+        except BaseException:
+            os.remove(path)
+            raise
+        return path
+
+    def submit(self, fn, *args, payload=None):
+        # Run fn(job, *args) on a worker. fn reports rows through job.append(),
+        # should return early once job.cancelled is set, and returns the
+        # summary. payload is a spool() path, moved to job.payload_path
+        self._expire()
+        self._ensure_started()
+        job = Job(self.store_dir)
+        if payload is not None:
+            os.replace(payload, job.payload_path)
+        try:
+            self._queue.put_nowait((job, fn, args))
+        except queue.Full:
+            shutil.rmtree(job.dir, ignore_errors=True)
+            raise QueueFull(f"{self._queue.maxsize} jobs are already waiting")
+        return job
+
+    def full(self):
+        return self._queue.full()
+
+    def get(self, job_id):
+        # Only ids of the form this queue creates, so a request cannot name
+        # a path outside the store
+        if not JOB_ID.fullmatch(job_id):
+            return None
+        job_dir = os.path.join(self.store_dir, job_id)
+        status = read_status(job_dir)
+        if status is None or os.path.exists(os.path.join(job_dir, REMOVED_NAME)):
+            return None
+        return StoredJob(job_dir, status)
+
+    def remove(self, job_id):
+        # Cancel the job and hide it; its directory is deleted once it ends
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.cancel()
+        open(os.path.join(job.dir, REMOVED_NAME), 'w').close()
+        if job.status in FINAL_STATUSES:
+            shutil.rmtree(job.dir, ignore_errors=True)
+        return job
+
+    def stats(self):
+        # Counts cover the jobs of every process sharing the store
+        counts = {status: 0 for status in ('queued', 'running', 'completed', 'failed', 'cancelled')}
+        for name in os.listdir(self.store_dir):
+            job_dir = os.path.join(self.store_dir, name)
+            status = read_status(job_dir) if JOB_ID.fullmatch(name) else None
+            if status is not None and not os.path.exists(os.path.join(job_dir, REMOVED_NAME)):
+                counts[status['status']] += 1
+        return dict(counts, workers=self.workers, max_pending=self._queue.maxsize)
+
+    def _ensure_started(self):
+        # Workers are started on first use so the queue can be created before a fork
+        if self._threads:
+            return
+        with self._lock:
+            if not self._threads:
+                for i in range(self.workers):
+                    thread = threading.Thread(target=self._run, name=f'job-worker-{i}', daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+
+    def _expire(self):
+        # Delete finished or removed jobs past the ttl, and spooled uploads
+        # left behind by a request that died before submitting them
+        now = time.time()
+        for name in os.listdir(self.store_dir):
+            path = os.path.join(self.store_dir, name)
+            if name.startswith(SPOOL_PREFIX):
+                try:
+                    if now - os.path.getmtime(path) > self.ttl:
+                        os.remove(path)
+                except OSError:
+                    pass
+                continue
+            status = read_status(path) if JOB_ID.fullmatch(name) else None
+            if status is not None and status['status'] in FINAL_STATUSES and (
+                    now - status['finished_at'] > self.ttl or os.path.exists(os.path.join(path, REMOVED_NAME))):
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _run(self):
+        while True:
+            job, fn, args = self._queue.get()
+            if job.cancelled:
+                job.finish()
+                continue
+            job.start()
+            try:
+                job.finish(fn(job, *args))
+            except Exception as e:
+                job.fail(str(e))
@@ -0,0 +1,80 @@
+import numpy as np
+
+# Skeleton joints, in the order the frontend draws them
+KEYPOINT_NAMES = (
+    'head', 'neck', 'spine', 'pelvis', 'tailbone',
+    'right_shoulder', 'right_elbow', 'left_shoulder', 'left_elbow',
+    'right_hand', 'right_fingers', 'left_hand', 'left_fingers',
+    'right_hip', 'right_knee', 'right_ankle',
+    'left_hip', 'left_knee', 'left_ankle'
+)
+NUM_KEYPOINTS = len(KEYPOINT_NAMES)
+
+# Template skeleton per pose class as [num_classes, NUM_KEYPOINTS, (x, y)], in
+# POSE_CLASSES order (Stand, Sit, Kneel, Sleep). Matches the frontend mock
+KEYPOINT_TABLE = np.array([
+    # Stand
+    [[0.5, 0.1], [0.5, 0.2], [0.5, 0.3], [0.5, 0.45], [0.5, 0.5],
+     [0.6, 0.2], [0.65, 0.35], [0.4, 0.2], [0.35, 0.35],
+     [0.7, 0.5], [0.7, 0.5], [0.3, 0.5], [0.3, 0.5],
+     [0.55, 0.6], [0.55, 0.75], [0.55, 0.9],
+     [0.45, 0.6], [0.45, 0.75], [0.45, 0.9]],
+    # Sit
+    [[0.5, 0.2], [0.5, 0.3], [0.5, 0.4], [0.5, 0.5], [0.5, 0.5],
+     [0.6, 0.3], [0.65, 0.4], [0.4, 0.3], [0.35, 0.4],
+     [0.7, 0.5], [0.7, 0.5], [0.3, 0.5], [0.3, 0.5],
+     [0.55, 0.5], [0.6, 0.7], [0.5, 0.9],
+     [0.45, 0.5], [0.4, 0.7], [0.5, 0.9]],
+    # Kneel
+    [[0.5, 0.2], [0.5, 0.3], [0.5, 0.4], [0.5, 0.5], [0.5, 0.55],
+     [0.6, 0.3], [0.7, 0.4], [0.4, 0.3], [0.3, 0.4],
+     [0.75, 0.5], [0.8, 0.5], [0.25, 0.5], [0.2, 0.5],
+     [0.55, 0.55], [0.55, 0.75], [0.7, 0.9],
+     [0.45, 0.55], [0.45, 0.75], [0.3, 0.9]],
+    # Sleep
+    [[0.1, 0.5], [0.2, 0.5], [0.4, 0.5], [0.6, 0.5], [0.7, 0.5],
+     [0.2, 0.4], [0.3, 0.35], [0.2, 0.6], [0.3, 0.65],
+     [0.4, 0.3], [0.45, 0.25], [0.4, 0.7], [0.45, 0.75],
+     [0.6, 0.45], [0.75, 0.4], [0.9, 0.4],
+     [0.6, 0.55], [0.75, 0.6], [0.9, 0.6]]
+], dtype=np.float32)
+KEYPOINT_TABLE.setflags(write=False)
+
+# Decimal places kept when keypoints are serialized (rounded in float64 so
+# the JSON does not carry float32 noise digits)
+KEYPOINT_DECIMALS = 4
+
+
+def blend_keypoints(confidences):
+    # Confidence-weighted blend of the class templates: [N, num_classes]
+    # softmax rows -> [N, NUM_KEYPOINTS, 2] in a single matrix product
+    confidences = np.asarray(confidences, dtype=np.float32)
+    if confidences.ndim == 1:
+        confidences = confidences[None]
+    flat = confidences @ KEYPOINT_TABLE.reshape(len(KEYPOINT_TABLE), -1)
+    return flat.reshape(-1, NUM_KEYPOINTS, 2)
+
+
+def smooth_keypoints(keypoints, window):
+    # Centred moving average over `window` consecutive rows, shrinking at the
+    # edges so the output keeps one row per input window
+    if window <= 1 or len(keypoints) <= 1:
+        return keypoints
+    n = len(keypoints)
+    half = window // 2
+    padded = np.zeros((n + 1,) + keypoints.shape[1:], dtype=np.float64)
+    np.cumsum(keypoints, axis=0, out=padded[1:])
+    lo = np.clip(np.arange(n) - half, 0, n)
+    hi = np.clip(np.arange(n) + window - half, 0, n)
+    counts = (hi - lo).reshape((-1,) + (1,) * (keypoints.ndim - 1))
+    return ((padded[hi] - padded[lo]) / counts).astype(keypoints.dtype)
+
+
+def flatten_keypoints(keypoints):
+    # Compact serialization: one flat, rounded list of x, y pairs row by row
+    return np.round(keypoints.astype(np.float64), KEYPOINT_DECIMALS).ravel().tolist()
+
+
+def keypoints_to_points(keypoints):
+    # A single [NUM_KEYPOINTS, 2] skeleton as the frontend's [{x, y}, ...]
+    return [{'x': x, 'y': y} for x, y in np.round(keypoints.astype(np.float64), KEYPOINT_DECIMALS).tolist()]
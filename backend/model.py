@@ -0,0 +1,169 @@
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from torch.nn.utils.rnn import pack_padded_sequence
+
+# Model definition only, with no training dependencies, so serving processes
+# can import it without pulling in pandas, scikit-learn or matplotlib
+
+class LSTM_Model(nn.Module):
+    def __init__(self, input_size=30, hidden_size=64, num_layers=2, num_classes=4):
+        super(LSTM_Model, self).__init__()
+        self.input_size = input_size
+        self.hidden_size = hidden_size
+        self.num_layers = num_layers
+        self.lstm = nn.LSTM(input_size, hidden_size, num_layers, batch_first=True)
+        self.fc1 = nn.Linear(hidden_size, 32)
+        self.fc2 = nn.Linear(32, num_classes + 1)  # +1 for presence detection
+        self.relu = nn.ReLU()
+        self.sigmoid = nn.Sigmoid()
+
+    def forward(self, x):
+        # Check if input is unbatched (2D) and add batch dimension if needed
+        if x.dim() == 2:
+            x = x.unsqueeze(0)  # Add batch dimension [1, seq_len, features]
+            
+        # Initialize hidden state with zeros
+        batch_size = x.size(0)
+        h0 = torch.zeros(self.num_layers, batch_size, self.hidden_size).to(x.device)
+        c0 = torch.zeros(self.num_layers, batch_size, self.hidden_size).to(x.device)
+        
+        # Forward propagate LSTM
+        out, _ = self.lstm(x, (h0, c0))
+        
+        # Decode the hidden state of the last time step
+        return self.decode(out[:, -1, :])
+
+    def decode(self, out):
+        out = self.relu(self.fc1(out))
+        out = self.fc2(out)
+        
+        # Split output into presence and pose
+        presence = self.sigmoid(out[:, 0])
+        pose = out[:, 1:]
+        
+        return presence, pose
+
+    def forward_packed(self, x, lengths):
+        # x is a zero-padded batch [batch, max_len, features] with the true length
+        # of each sequence; every sequence is decoded at its own last time step
+        packed = pack_padded_sequence(x, lengths.cpu(), batch_first=True, enforce_sorted=False)
+        _, (h_n, _) = self.lstm(packed)
+        return self.decode(h_n[-1])
+
+    def forward_stateful(self, x, state=None):
+        # Continue the sequence from a previous (h, c) instead of zeros, so a
+        # stream can be advanced chunk by chunk. Returns the new state as well.
+        if x.dim() == 2:
+            x = x.unsqueeze(0)
+        
+        if state is None:
+            batch_size = x.size(0)
+            h0 = torch.zeros(self.num_layers, batch_size, self.hidden_size).to(x.device)
+            c0 = torch.zeros(self.num_layers, batch_size, self.hidden_size).to(x.device)
+            state = (h0, c0)
+        
+        out, state = self.lstm(x, state)
+        presence, pose = self.decode(out[:, -1, :])
+        
+        return presence, pose, state
+
+
+class TemporalCNN_Model(nn.Module):
+    # Small student for edge serving: causal dilated 1D convolutions over time
+    # with residual connections. All time steps are computed in parallel
+    # instead of one recurrent step after another, and like LSTM_Model the
+    # features of the last time step are decoded into presence and pose
+    def __init__(self, input_size=30, channels=32, num_layers=4, kernel_size=3, num_classes=4):
+        super(TemporalCNN_Model, self).__init__()
+        self.input_size = input_size
+        self.convs = nn.ModuleList(
+            nn.Conv1d(input_size if i == 0 else channels, channels, kernel_size, dilation=2 ** i)
+            for i in range(num_layers))
+        self.fc1 = nn.Linear(channels, 32)
+        self.fc2 = nn.Linear(32, num_classes + 1)  # +1 for presence detection
+        self.relu = nn.ReLU()
+        self.sigmoid = nn.Sigmoid()
+        # Rows that influence one output step
+        self.receptive_field = 1 + (kernel_size - 1) * (2 ** num_layers - 1)
+
+    def features(self, x):
+        # [batch, seq_len, features] -> [batch, channels, seq_len]
+        out = x.transpose(1, 2)
+        for i, conv in enumerate(self.convs):
+            # Left padding only, so step t never sees rows after t
+            y = self.relu(conv(F.pad(out, (conv.dilation[0] * (conv.kernel_size[0] - 1), 0))))
+            out = y if i == 0 else out + y
+        return out
+
+    def forward(self, x):
+        if x.dim() == 2:
+            x = x.unsqueeze(0)
+        # Rows before the receptive field cannot affect the last step
+        return self.decode(self.features(x[:, -self.receptive_field:])[:, :, -1])
+
+    def decode(self, out):
+        out = self.relu(self.fc1(out))
+        out = self.fc2(out)
+        return self.sigmoid(out[:, 0]), out[:, 1:]
+
+    def forward_packed(self, x, lengths):
+        # Causal convolutions ignore the padding after each sequence, so every
+        # sequence is decoded at its own last step of the padded batch
+        out = self.features(x)
+        last = (lengths.to(x.device).long() - 1).view(-1, 1, 1).expand(-1, out.size(1), 1)
+        return self.decode(out.gather(2, last).squeeze(2))
+
+    def forward_stateful(self, x, state=None):
+        # The state is the last receptive_field - 1 input rows, which is all a
+        # later step needs from the past
+        if x.dim() == 2:
+            x = x.unsqueeze(0)
+        if state is not None:
+            x = torch.cat([state, x], dim=1)
+        presence, pose = self.forward(x)
+        # Sliced from the front: with a receptive field of 1 this keeps no
+        # rows, where x[:, -0:] would keep the whole history
+        return presence, pose, x[:, x.size(1) - (self.receptive_field - 1):]
+
+
+ARCHITECTURES = ('lstm', 'cnn')
+
+
+def build_model(architecture='lstm', input_size=30, hidden_size=64, num_layers=2, num_classes=4,
+                channels=32, kernel_size=3):
+    # hidden_size applies to the LSTM, channels and kernel_size to the CNN
+    if architecture == 'lstm':
+        return LSTM_Model(input_size, hidden_size, num_layers, num_classes)
+    if architecture == 'cnn':
+        return TemporalCNN_Model(input_size, channels, num_layers, kernel_size, num_classes)
+    raise ValueError(f"Unknown architecture: {architecture}")
+
+
+def load_state_dict(path):
+    # Accepts a saved state dict or a train_model checkpoint
+    state = torch.load(path, map_location=torch.device('cpu'))
+    return state['model'] if 'optimizer' in state else state
+
+
+def model_config(state_dict):
+    # build_model() arguments read back from the weight shapes
+    config = {'num_classes': state_dict['fc2.weight'].size(0) - 1}
+    if 'lstm.weight_ih_l0' in state_dict:
+        config.update(architecture='lstm',
+                      input_size=state_dict['lstm.weight_ih_l0'].size(1),
+                      hidden_size=state_dict['lstm.weight_hh_l0'].size(1),
+                      num_layers=sum(1 for k in state_dict if k.startswith('lstm.weight_ih_l')))
+    else:
+        channels, input_size, kernel_size = state_dict['convs.0.weight'].shape
+        config.update(architecture='cnn', input_size=input_size, channels=channels, kernel_size=kernel_size,
+                      num_layers=sum(1 for k in state_dict if k.startswith('convs.') and k.endswith('.weight')))
+    return config
+
+
+def model_from_state_dict(state_dict):
+    # Rebuild the architecture from the weight shapes, so checkpoints of
+    # either architecture and any size (sweeps, distilled students) load
+    model = build_model(**model_config(state_dict))
+    model.load_state_dict(state_dict)
+    return model.eval()
@@ -0,0 +1,202 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+
+# Add the parent directory to the path so we can import the LSTM model
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.model import load_state_dict, model_config, model_from_state_dict
+from backend.preprocessing import preprocessor_path
+
+# Registry layout:
+#   <registry>/v0001/model.pth       checkpoint (state dict)
+#   <registry>/v0001/metadata.json   architecture, classes and metrics
+#   <registry>/v0001/model.preprocess.json  optional preprocessing stats
+#   <registry>/ACTIVE                optional pinned version (set by rollback)
+# Without a pin the newest version is active.
+CHECKPOINT_NAME = 'model.pth'
+METADATA_NAME = 'metadata.json'
+PIN_NAME = 'ACTIVE'
+
+DEFAULT_CLASSES = ['Stand', 'Sit', 'Kneel', 'Sleep']
+
+
+def version_names(registry_dir):
+    # Directory names of every published version, oldest first
+    if not os.path.isdir(registry_dir):
+        return []
+    return [name for name in sorted(os.listdir(registry_dir))
+            if name.startswith('v') and os.path.exists(os.path.join(registry_dir, name, METADATA_NAME))]
+
+
+def check_version(registry_dir, version):
+    # Versions come from clients (/models/rollback), so only the names of
+    # published versions are accepted, never a path
+    if version not in version_names(registry_dir):
+        raise ValueError(f"Unknown model version: {version}")
+
+
+def list_versions(registry_dir):
+    # Metadata of every published version, oldest first
+    versions = []
+    for name in version_names(registry_dir):
+        with open(os.path.join(registry_dir, name, METADATA_NAME)) as f:
+            versions.append(json.load(f))
+    return versions
+
+
+def register_model(registry_dir, checkpoint_path, metrics=None, classes=DEFAULT_CLASSES):
+    # Publish a checkpoint as the next version. The files are written to a
+    # temporary directory and renamed into place, so watchers never see a
+    # half-written version. The architecture recorded in the metadata is read
+    # from the weights, the same way load_version rebuilds the model
+    os.makedirs(registry_dir, exist_ok=True)
+    metadata = model_config(load_state_dict(checkpoint_path))
+    if len(classes) != metadata['num_classes']:
+        raise ValueError(f"Checkpoint has {metadata['num_classes']} classes, got {len(classes)} names")
+    metadata['classes'] = list(classes)
+
+    while True:
+        existing = [int(v['version'][1:]) for v in list_versions(registry_dir)]
+        version = f"v{max(existing, default=0) + 1:04d}"
+        staging = os.path.join(registry_dir, f".{version}.{os.getpid()}.tmp")
+        os.makedirs(staging, exist_ok=True)
+        shutil.copyfile(checkpoint_path, os.path.join(staging, CHECKPOINT_NAME))
+        # Preprocessing stats travel with the checkpoint they were trained with
+        if os.path.exists(preprocessor_path(checkpoint_path)):
+            shutil.copyfile(preprocessor_path(checkpoint_path),
+                            preprocessor_path(os.path.join(staging, CHECKPOINT_NAME)))
+        metadata.update(version=version, metrics=metrics or {}, created_at=time.strftime('%Y-%m-%dT%H:%M:%S'))
+        with open(os.path.join(staging, METADATA_NAME), 'w') as f:
+            json.dump(metadata, f, indent=2)
+        try:
+            os.rename(staging, os.path.join(registry_dir, version))
+            return version
+        except OSError:
+            # Another process published this version number first
+            shutil.rmtree(staging, ignore_errors=True)
+
+
+def pinned_version(registry_dir):
+    try:
+        with open(os.path.join(registry_dir, PIN_NAME)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def active_version(registry_dir):
+    # The pinned version if set, otherwise the newest one
+    pinned = pinned_version(registry_dir)
+    if pinned is not None:
+        return pinned
+    versions = list_versions(registry_dir)
+    return versions[-1]['version'] if versions else None
+
+
+def pin_version(registry_dir, version):
+    # Pin a version (None follows the newest again). Written atomically so
+    # every serving process picks up the same value
+    path = os.path.join(registry_dir, PIN_NAME)
+    if version is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    check_version(registry_dir, version)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(version)
+    os.replace(tmp_path, path)
+
+
+def load_version(registry_dir, version):
+    # Load the checkpoint and its metadata
+    check_version(registry_dir, version)
+    with open(os.path.join(registry_dir, version, METADATA_NAME)) as f:
+        metadata = json.load(f)
+    # The architecture is read from the weights, so distilled students can be
+    # published as versions too
+    model = model_from_state_dict(load_state_dict(os.path.join(registry_dir, version, CHECKPOINT_NAME)))
+    return model, metadata
+
+
+class ModelSlot:
+    # Holds the serving (model, version) pair. Requests read both with one
+    # attribute access, so a swap never mixes a model with another's version
+    def __init__(self, model=None, version=None):
+        self.current = (model, version)
+        self.lock = threading.Lock()
+
+    def get(self):
+        return self.current
+
+    def swap(self, model, version):
+        with self.lock:
+            previous = self.current
+            self.current = (model, version)
+            return previous
+
+
+class RegistryWatcher:
+    # Polls the registry and calls load_fn(version) in the background when the
+    # active version changes
+    def __init__(self, registry_dir, slot, load_fn, poll_seconds=5.0):
+        self.registry_dir = registry_dir
+        self.slot = slot
+        self.load_fn = load_fn
+        self.poll_seconds = poll_seconds
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='model-registry-watcher', daemon=True)
+            self._thread.start()
+
+    def check(self):
+        version = active_version(self.registry_dir)
+        if version is not None and version != self.slot.get()[1]:
+            self.load_fn(version)
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_seconds)
+            try:
+                self.check()
+            except Exception as e:
+                print(f"Error reloading model from registry: {str(e)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the versioned model registry")
+    parser.add_argument('--registry', default='models')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    register = subparsers.add_parser('register', help="Publish a checkpoint as a new version")
+    register.add_argument('checkpoint')
+    register.add_argument('--classes', nargs='+', default=DEFAULT_CLASSES, help="Class names in output order")
+    register.add_argument('--metrics', default='{}', help="JSON object of evaluation metrics")
+
+    subparsers.add_parser('list', help="List published versions")
+
+    pin = subparsers.add_parser('pin', help="Pin a version, or 'latest' to follow the newest")
+    pin.add_argument('version')
+    args = parser.parse_args()
+
+    if args.command == 'register':
+        version = register_model(args.registry, args.checkpoint, json.loads(args.metrics), args.classes)
+        print(f"Registered {args.checkpoint} as {version}")
+    elif args.command == 'list':
+        active = active_version(args.registry)
+        for metadata in list_versions(args.registry):
+            marker = '*' if metadata['version'] == active else ' '
+            print(f"{marker} {metadata['version']}  {metadata['created_at']}  {json.dumps(metadata['metrics'])}")
+    else:
+        pin_version(args.registry, None if args.version == 'latest' else args.version)
+        print(f"Active version: {active_version(args.registry)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# Rows processed per step; small enough that a block's intermediates stay in cache
+BLOCK_ROWS = 4096
+# Scale factor turning a median absolute deviation into a standard deviation
+MAD_SCALE = 1.4826
+# Rows read, filtered and written per step when preprocessing a .npy file
+FILE_CHUNK_ROWS = 1 << 20
+
+
+def _sort2(p, i, j):
+    # Compare-exchange of two whole arrays: p[i] <- min, p[j] <- max
+    lo = np.minimum(p[i], p[j])
+    np.maximum(p[i], p[j], out=p[j])
+    p[i] = lo
+
+
+# Median selection networks (Devillard) as compare-exchange index pairs
+MEDIAN_NETWORKS = {
+    3: ((0, 1), (1, 2), (0, 1)),
+    5: ((0, 1), (3, 4), (0, 3), (1, 4), (1, 2), (2, 3), (1, 2)),
+    7: ((0, 5), (0, 3), (1, 6), (2, 4), (0, 1), (3, 5), (2, 6), (2, 3), (3, 6),
+        (4, 5), (1, 4), (1, 3), (3, 4))
+}
+
+
+def elementwise_median(arrays):
+    # Median across a list of equally shaped arrays, as whole-array min/max
+    # operations for the common window sizes
+    network = MEDIAN_NETWORKS.get(len(arrays))
+    if network is None:
+        return np.median(np.stack(arrays), axis=0).astype(arrays[0].dtype)
+    p = [a.copy() for a in arrays]
+    for i, j in network:
+        _sort2(p, i, j)
+    return p[len(p) // 2]
+
+
+class PreprocessState:
+    # Per-stream carry-over between blocks: the last window - 1 raw rows for
+    # the Hampel filter and the IIR filter delays
+    def __init__(self):
+        self.tail = None
+        self.zi = None
+
+
+class Preprocessor:
+    """Causal CSI preprocessing shared by training and serving.
+
+    Each [rows, subcarriers] block goes through a trailing-window Hampel
+    outlier filter, a low-pass Butterworth IIR filter along time and
+    per-subcarrier standardisation. Every stage only looks at current and
+    past rows and keeps its state in a PreprocessState, so a recording gives
+    the same output whether it is processed at once or chunk by chunk.
+    hampel_window=0 or filter_cutoff=None disables that stage; mean and std
+    are set by fit() and saved next to the checkpoint.
+    """
+
+    def __init__(self, mean=None, std=None, hampel_window=5, hampel_sigmas=3.0,
+                 filter_order=2, filter_cutoff=0.25):
+        self.mean = None if mean is None else np.asarray(mean, dtype=np.float32)
+        self.std = None if std is None else np.asarray(std, dtype=np.float32)
+        self.hampel_window = hampel_window
+        self.hampel_sigmas = hampel_sigmas
+        self.filter_order = filter_order
+        self.filter_cutoff = filter_cutoff
+        if filter_cutoff:
+            # scipy.signal takes about a second to import, so the server only
+            # pays for it when the model was trained with the filter
+            from scipy.signal import butter, lfilter, lfilter_zi
+            self._lfilter = lfilter
+            b, a = butter(filter_order, filter_cutoff)
+            # float32 coefficients keep lfilter in single precision
+            self._b, self._a = b.astype(np.float32), a.astype(np.float32)
+            self._zi = lfilter_zi(b, a).astype(np.float32)[:, None]
+
+    @property
+    def temporal(self):
+        # Whether any stage depends on earlier rows, i.e. needs time-ordered input
+        return self.hampel_window > 1 or bool(self.filter_cutoff)
+
+    def tag(self):
+        # Short digest of the settings and stats, naming files preprocessed with them
+        encoded = json.dumps(self.to_dict(), sort_keys=True).encode()
+        return hashlib.sha1(encoded).hexdigest()[:12]
+
+    def __call__(self, block, state=None):
+        # Preprocess [rows, subcarriers] and return it as float32. Pass the
+        # same state for consecutive chunks of one recording or stream
+        state = state if state is not None else PreprocessState()
+        block = np.ascontiguousarray(block, dtype=np.float32)
+        out = np.empty_like(block)
+        for start in range(0, block.shape[0], BLOCK_ROWS):
+            out[start:start + BLOCK_ROWS] = self._process_block(block[start:start + BLOCK_ROWS], state)
+        if self.mean is not None:
+            out -= self.mean
+            out /= self.std
+        return out
+
+    def _process_block(self, x, state):
+        if self.hampel_window > 1:
+            x = self._hampel(x, state)
+        if self.filter_cutoff:
+            if state.zi is None:
+                # Start from the steady state of the first row, not from zero
+                state.zi = self._zi * x[:1]
+            x, state.zi = self._lfilter(self._b, self._a, x, axis=0, zi=state.zi)
+        return x
+
+    def _hampel(self, x, state):
+        # Replace values further than hampel_sigmas scaled MADs from the
+        # median of the trailing window with that median
+        w = self.hampel_window
+        if state.tail is None:
+            state.tail = np.repeat(x[:1], w - 1, axis=0)
+        ext = np.concatenate([state.tail, x])
+        state.tail = ext[-(w - 1):]
+        rows = x.shape[0]
+        window = [ext[i:i + rows] for i in range(w)]
+        median = elementwise_median(window)
+        mad = elementwise_median([np.abs(v - median) for v in window])
+        outlier = np.abs(x - median) > (self.hampel_sigmas * MAD_SCALE) * mad
+        return np.where(outlier, median, x)
+
+    def fit(self, csi, recording_length=None):
+        # Per-subcarrier mean and std of the filtered data. recording_length
+        # splits csi into independent recordings; None treats it as one
+        self.mean = self.std = None
+        length = recording_length or len(csi)
+        count = 0
+        total = np.zeros(csi.shape[1], dtype=np.float64)
+        total_sq = np.zeros(csi.shape[1], dtype=np.float64)
+        # Filtered in bounded chunks so a memory-mapped dataset is never
+        # loaded whole
+        for recording in range(0, len(csi), length):
+            state = PreprocessState()
+            end = min(recording + length, len(csi))
+            for start in range(recording, end, FILE_CHUNK_ROWS):
+                filtered = self(csi[start:min(start + FILE_CHUNK_ROWS, end)], state).astype(np.float64)
+                total += filtered.sum(axis=0)
+                total_sq += np.square(filtered).sum(axis=0)
+                count += len(filtered)
+        mean = total / max(count, 1)
+        std = np.sqrt(np.maximum(total_sq / max(count, 1) - mean ** 2, 0))
+        self.mean = mean.astype(np.float32)
+        self.std = np.maximum(std, 1e-6).astype(np.float32)
+        return self
+
+    def to_dict(self):
+        return {
+            'mean': None if self.mean is None else self.mean.tolist(),
+            'std': None if self.std is None else self.std.tolist(),
+            'hampel_window': self.hampel_window,
+            'hampel_sigmas': self.hampel_sigmas,
+            'filter_order': self.filter_order,
+            'filter_cutoff': self.filter_cutoff
+        }
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(**json.load(f))
+
+
+def preprocess_npy(preprocessor, src_path, dst_path, chunk_rows=FILE_CHUNK_ROWS):
+    # Preprocess a [rows, subcarriers] .npy file into another .npy file chunk
+    # by chunk, carrying the filter state, so memory use stays bounded. The
+    # output is written under a temporary name and renamed into place, and
+    # reused until the source is rewritten
+    if os.path.exists(dst_path) and os.path.getmtime(dst_path) >= os.path.getmtime(src_path):
+        return dst_path
+    src = np.load(src_path, mmap_mode='r')
+    tmp_path = f"{dst_path}.{os.getpid()}.tmp.npy"
+    dst = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=src.shape)
+    state = PreprocessState()
+    for start in range(0, len(src), chunk_rows):
+        dst[start:start + chunk_rows] = preprocessor(src[start:start + chunk_rows], state)
+    dst.flush()
+    del dst
+    os.replace(tmp_path, dst_path)
+    return dst_path
+
+
+def preprocessor_path(checkpoint_path):
+    # Preprocessing stats live next to the checkpoint they were trained with
+    return os.path.splitext(checkpoint_path)[0] + '.preprocess.json'
+
+
+def load_preprocessor(checkpoint_path):
+    # The checkpoint's Preprocessor, or None if it was trained on raw CSI
+    path = preprocessor_path(checkpoint_path)
+    return Preprocessor.load(path) if os.path.exists(path) else None
@@ -0,0 +1,72 @@
+import argparse
+import io
+import os
+import sys
+
+import torch
+import torch.nn as nn
+
+# Add the parent directory to the path so we can import the backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.model import LSTM_Model, build_model, load_state_dict, model_config, model_from_state_dict
+
+QUANTIZED_MODEL_PATH = 'pose_detection_model_int8.pth'
+
+
+def select_quantized_engine():
+    # fbgemm on x86, qnnpack on ARM gateways
+    supported = torch.backends.quantized.supported_engines
+    if 'fbgemm' not in supported and 'qnnpack' in supported:
+        torch.backends.quantized.engine = 'qnnpack'
+
+
+def quantize_model(model):
+    # Dynamic int8: LSTM and Linear weights are stored as int8 and
+    # activations are quantized on the fly, so no calibration data is needed.
+    # The CNN's convolutions have no dynamic int8 kernel and stay fp32
+    select_quantized_engine()
+    return torch.quantization.quantize_dynamic(model.eval(), {nn.LSTM, nn.Linear}, dtype=torch.qint8)
+
+
+def save_quantized_model(model, quantized, path):
+    # The int8 state dict alone does not say which architecture to rebuild,
+    # so the fp32 model's build_model() arguments are saved next to it
+    torch.save({'architecture': model_config(model.state_dict()), 'state_dict': quantized.state_dict()}, path)
+
+
+def load_quantized_model(path=QUANTIZED_MODEL_PATH):
+    # The quantized module structure has to exist before its state dict can be loaded
+    state = torch.load(path, map_location=torch.device('cpu'))
+    if 'architecture' in state:
+        model = quantize_model(build_model(**state['architecture']))
+        state = state['state_dict']
+    else:
+        # Files written before the architecture was saved hold the default LSTM
+        model = quantize_model(LSTM_Model())
+    model.load_state_dict(state)
+    model.eval()
+    return model
+
+
+def model_size_mb(model):
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create a dynamic int8 quantized copy of the pose model")
+    parser.add_argument('--checkpoint', default='pose_detection_model.pth')
+    parser.add_argument('--output', default=QUANTIZED_MODEL_PATH)
+    args = parser.parse_args()
+    
+    model = model_from_state_dict(load_state_dict(args.checkpoint))
+    quantized = quantize_model(model)
+    save_quantized_model(model, quantized, args.output)
+    
+    print(f"Saved int8 model to {args.output}")
+    print(f"Size: fp32 {model_size_mb(model):.3f} MB -> int8 {model_size_mb(quantized):.3f} MB")
+
+
+if __name__ == "__main__":
+    main()
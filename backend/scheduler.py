@@ -0,0 +1,132 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import torch
+from torch.nn.utils.rnn import pad_sequence
+
+
+def power_of_two_bucket(value):
+    # Smallest power of two >= value, used as the histogram bucket label
+    bucket = 1
+    while bucket < value:
+        bucket *= 2
+    return bucket
+
+
+class InferenceScheduler:
+    """Groups concurrent inference requests into batched forward passes.
+
+    Requests are queued and collected for at most max_wait_ms (or until
+    max_batch_size requests are waiting), split into length buckets of
+    bucket_width rows, and each bucket runs as one packed LSTM forward.
+    """
+
+    def __init__(self, model=None, max_batch_size=32, max_wait_ms=2.0, bucket_width=64):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.bucket_width = bucket_width
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.batches_run = 0
+        self.requests_served = 0
+        self.batch_size_hist = {}
+        self.queue_depth_hist = {}
+
+    def submit(self, features, model=None):
+        # Queue a [seq_len, features] tensor; the future resolves to
+        # (presence [1], pose_logits [1, num_classes]) like model(features).
+        # Passing the model pins the request to it across hot swaps
+        self._ensure_started()
+        future = Future()
+        self._queue.put((features, future, model or self.model))
+        return future
+
+    def infer(self, features, model=None, timeout=None):
+        return self.submit(features, model).result(timeout)
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'batches_run': self.batches_run,
+                'requests_served': self.requests_served,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'batch_size_histogram': dict(sorted(self.batch_size_hist.items())),
+                'queue_depth_histogram': dict(sorted(self.queue_depth_hist.items()))
+            }
+
+    def _ensure_started(self):
+        # The worker thread is started lazily so the scheduler can be created
+        # before a fork without carrying a dead thread into the children
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='inference-scheduler', daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        # Block for the first request, then gather more until the batch is
+        # full or max_wait has passed since the first one arrived
+        batch = [self._queue.get()]
+        depth = self._queue.qsize() + 1
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch, depth
+
+    def _run(self):
+        while True:
+            batch, depth = self._collect()
+            
+            buckets = {}
+            for item in batch:
+                key = (id(item[2]), -(-item[0].size(0) // self.bucket_width))
+                buckets.setdefault(key, []).append(item)
+            
+            for items in buckets.values():
+                self._run_bucket(items)
+            
+            with self._stats_lock:
+                label = power_of_two_bucket(depth)
+                self.queue_depth_hist[label] = self.queue_depth_hist.get(label, 0) + 1
+
+    def _run_bucket(self, items):
+        # Every item in a bucket targets the same model
+        model = items[0][2]
+        try:
+            with torch.no_grad():
+                if len(items) == 1:
+                    presence, pose_logits = model(items[0][0])
+                else:
+                    sequences = [features for features, _, _ in items]
+                    lengths = torch.tensor([seq.size(0) for seq in sequences])
+                    padded = pad_sequence(sequences, batch_first=True)
+                    presence, pose_logits = model.forward_packed(padded, lengths)
+        except Exception as e:
+            for _, future, _ in items:
+                future.set_exception(e)
+            return
+        
+        with self._stats_lock:
+            self.batches_run += 1
+            self.requests_served += len(items)
+            self.batch_size_hist[len(items)] = self.batch_size_hist.get(len(items), 0) + 1
+        
+        for i, (_, future, _) in enumerate(items):
+            future.set_result((presence[i:i + 1], pose_logits[i:i + 1]))
@@ -0,0 +1,247 @@
+import threading
+import time
+
+import numpy as np
+
+from backend.preprocessing import PreprocessState
+
+
+class HubFull(Exception):
+    pass
+
+
+class SensorHub:
+    """Fan-in of many CSI links into batched inference and per-room results.
+
+    Every sensor owns one slot of a preallocated [max_sensors, window,
+    features] ring buffer, so memory use is fixed no matter how many frames
+    arrive; idle sensors are expired and their slots reused. step() gathers
+    the windows of all sensors with new rows since the last step into one
+    [N, window, features] batch, runs a single predict call over it and
+    rooms_result() fuses the per-sensor outputs into one result per room.
+    """
+
+    def __init__(self, max_sensors=512, window=50, num_features=30, num_classes=4, sensor_ttl=60):
+        self.max_sensors = max_sensors
+        self.window = window
+        self.num_features = num_features
+        self.sensor_ttl = sensor_ttl
+        self.buffer = np.zeros((max_sensors, window, num_features), dtype=np.float32)
+        self.write_pos = np.zeros(max_sensors, dtype=np.int64)  # Next row to overwrite
+        self.rows_seen = np.zeros(max_sensors, dtype=np.int64)
+        self.fresh = np.zeros(max_sensors, dtype=bool)  # New rows since the last step
+        self.last_seen = np.zeros(max_sensors, dtype=np.float64)
+        # Bumped whenever a slot is cleared, so late results for it are dropped
+        self.generation = np.zeros(max_sensors, dtype=np.int64)
+        # Latest model output per sensor
+        self.has_result = np.zeros(max_sensors, dtype=bool)
+        self.presence = np.zeros(max_sensors, dtype=np.float32)
+        self.confidences = np.zeros((max_sensors, num_classes), dtype=np.float32)
+        self.slots = {}  # sensor id -> slot
+        self.sensor_ids = [None] * max_sensors
+        self.sensor_rooms = [None] * max_sensors
+        self.preprocess_states = [None] * max_sensors
+        self.free_slots = list(range(max_sensors - 1, -1, -1))
+        self.model_version = None
+        self.steps = 0
+        self.last_step_seconds = 0.0
+        self.last_batch_size = 0
+        self._offsets = np.arange(window)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def push(self, sensor_id, room, frames, preprocessor=None, model_version=None):
+        # Append [rows, features] frames to a sensor's ring and return the
+        # rows seen so far. Buffered rows are preprocessed for the serving
+        # model, so they are dropped when it changes. Pushes for one sensor
+        # are expected in order, one at a time
+        with self._lock:
+            if model_version != self.model_version:
+                self._reset(model_version)
+            slot = self.slots.get(sensor_id)
+            if slot is None:
+                slot = self._add_sensor(sensor_id)
+            self.sensor_rooms[slot] = room
+            generation = self.generation[slot]
+            if preprocessor is not None and self.preprocess_states[slot] is None:
+                self.preprocess_states[slot] = PreprocessState()
+            state = self.preprocess_states[slot]
+
+        # Filtering runs outside the lock so other sensors are not held up
+        if preprocessor is not None:
+            frames = preprocessor(frames, state)
+
+        with self._lock:
+            if self.generation[slot] != generation:
+                return 0  # Cleared by a model change or expiry meanwhile
+            # Only the last window rows can survive; write them in one scatter
+            rows = min(len(frames), self.window)
+            idx = (self.write_pos[slot] + self._offsets[:rows] + len(frames) - rows) % self.window
+            self.buffer[slot, idx] = frames[-rows:]
+            self.write_pos[slot] = (self.write_pos[slot] + len(frames)) % self.window
+            self.rows_seen[slot] += len(frames)
+            self.fresh[slot] = True
+            self.last_seen[slot] = time.monotonic()
+            return int(self.rows_seen[slot])
+
+    def step(self, predict, model_version=None):
+        # One batched forward over every sensor with a full window and new
+        # rows. predict maps [N, window, features] float32 to (presence [N],
+        # confidences [N, classes]) arrays. Returns the number of windows run
+        start = time.perf_counter()
+        with self._lock:
+            self._expire()
+            if model_version != self.model_version:
+                self._reset(model_version)
+                return 0
+            slots = np.flatnonzero(self.fresh & (self.rows_seen >= self.window))
+            if len(slots) == 0:
+                return 0
+            # Rows of each ring in time order, oldest first, gathered in one copy
+            rows = (self.write_pos[slots, None] + self._offsets) % self.window
+            windows = self.buffer[slots[:, None], rows]
+            generations = self.generation[slots]
+            self.fresh[slots] = False
+
+        presence, confidences = predict(windows)
+
+        with self._lock:
+            # Drop results for slots cleared while the forward pass ran
+            live = self.generation[slots] == generations
+            slots = slots[live]
+            self.presence[slots] = presence[live]
+            self.confidences[slots] = confidences[live]
+            self.has_result[slots] = True
+            self.steps += 1
+            self.last_batch_size = len(generations)
+            self.last_step_seconds = time.perf_counter() - start
+        return len(generations)
+
+    def rooms_result(self, classes, presence_threshold=0.5):
+        # Fuse the latest per-sensor outputs by room: presence is the mean
+        # score of the room's links and pose confidences are averaged with
+        # each link weighted by its presence score, so links that see the
+        # person dominate
+        with self._lock:
+            slots = np.flatnonzero(self.has_result)
+            rooms = [self.sensor_rooms[slot] for slot in slots.tolist()]
+            presence = self.presence[slots].astype(np.float64)
+            confidences = self.confidences[slots].astype(np.float64)
+        if not rooms:
+            return {}
+
+        names, room_index = np.unique(rooms, return_inverse=True)
+        num_rooms = len(names)
+        sensors = np.bincount(room_index, minlength=num_rooms)
+        presence_total = np.bincount(room_index, weights=presence, minlength=num_rooms)
+        weighted = np.zeros((num_rooms, len(classes)))
+        np.add.at(weighted, room_index, confidences * presence[:, None])
+        unweighted = np.zeros((num_rooms, len(classes)))
+        np.add.at(unweighted, room_index, confidences)
+        # A room where no link sees anyone falls back to the plain mean
+        fused = np.where(presence_total[:, None] > 0,
+                         weighted / np.maximum(presence_total, 1e-12)[:, None],
+                         unweighted / sensors[:, None])
+        presence_score = presence_total / sensors
+
+        results = {}
+        for i, room in enumerate(names.tolist()):
+            results[room] = {
+                'human_present': bool(presence_score[i] > presence_threshold),
+                'presence_score': float(presence_score[i]),
+                'pose_class': classes[int(fused[i].argmax())],
+                'confidence': {name: float(fused[i, c]) for c, name in enumerate(classes)},
+                'sensors': int(sensors[i])
+            }
+        return results
+
+    def sensor_result(self, sensor_id, classes):
+        with self._lock:
+            slot = self.slots.get(sensor_id)
+            if slot is None:
+                return None
+            result = {
+                'sensor_id': sensor_id,
+                'room': self.sensor_rooms[slot],
+                'rows_seen': int(self.rows_seen[slot]),
+                'ready': bool(self.rows_seen[slot] >= self.window)
+            }
+            if self.has_result[slot]:
+                confidences = self.confidences[slot]
+                result.update({
+                    'human_present': bool(self.presence[slot] > 0.5),
+                    'presence_score': float(self.presence[slot]),
+                    'pose_class': classes[int(confidences.argmax())],
+                    'confidence': {name: float(confidences[c]) for c, name in enumerate(classes)}
+                })
+            return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'sensors': len(self.slots),
+                'max_sensors': self.max_sensors,
+                'ready': int(np.count_nonzero(self.rows_seen >= self.window)),
+                'rooms': len({self.sensor_rooms[slot] for slot in self.slots.values()}),
+                'window': self.window,
+                'steps': self.steps,
+                'last_batch_size': self.last_batch_size,
+                'last_step_seconds': self.last_step_seconds,
+                'buffer_bytes': self.buffer.nbytes
+            }
+
+    def start(self, run_step, interval):
+        # Call run_step() every interval seconds on a background thread.
+        # Started on first use so the hub can be created before a fork
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, args=(run_step, interval),
+                                                name='sensor-fan-in', daemon=True)
+                self._thread.start()
+
+    def _run(self, run_step, interval):
+        while True:
+            started = time.monotonic()
+            try:
+                run_step()
+            except Exception as e:
+                print(f"Error in sensor fan-in step: {str(e)}")
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    def _add_sensor(self, sensor_id):
+        self._expire()
+        if not self.free_slots:
+            raise HubFull(f"{self.max_sensors} sensors are already connected")
+        slot = self.free_slots.pop()
+        self.slots[sensor_id] = slot
+        self.sensor_ids[slot] = sensor_id
+        self.last_seen[slot] = time.monotonic()
+        return slot
+
+    def _clear(self, slots):
+        self.write_pos[slots] = 0
+        self.rows_seen[slots] = 0
+        self.fresh[slots] = False
+        self.has_result[slots] = False
+        self.generation[slots] += 1
+        for slot in slots.tolist():
+            self.preprocess_states[slot] = None
+
+    def _reset(self, model_version):
+        # Rows buffered for another model are not valid input for this one;
+        # sensors stay registered and refill within one window
+        self.model_version = model_version
+        self._clear(np.arange(self.max_sensors))
+
+    def _expire(self):
+        now = time.monotonic()
+        expired = [slot for slot in self.slots.values() if now - self.last_seen[slot] > self.sensor_ttl]
+        for slot in expired:
+            del self.slots[self.sensor_ids[slot]]
+            self.sensor_ids[slot] = None
+            self.sensor_rooms[slot] = None
+            self.free_slots.append(slot)
+        if expired:
+            self._clear(np.array(expired))
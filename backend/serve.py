@@ -0,0 +1,81 @@
+import argparse
+import os
+import sys
+
+import torch
+from gunicorn.app.base import BaseApplication
+
+# Add the parent directory to the path so we can import the server
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class PoseServer(BaseApplication):
+    # Gunicorn application wrapping the already-imported Flask app
+    def __init__(self, application, options):
+        self.application = application
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+
+def make_post_fork(server, threads_per_worker):
+    def post_fork(arbiter, worker):
+        # Each worker gets its own slice of the cores, then warms up so /ready
+        # only reports healthy once a forward pass has run in this process
+        torch.set_num_threads(threads_per_worker)
+        server.warm_up()
+        server.start_model_watcher()
+        arbiter.log.info(f"Worker {worker.pid} ready with {threads_per_worker} torch threads")
+    return post_fork
+
+
+def main():
+    cpu_count = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Serve the pose model with multiple worker processes")
+    parser.add_argument('--bind', default='0.0.0.0:5000')
+    parser.add_argument('--workers', type=int, default=cpu_count)
+    parser.add_argument('--threads-per-worker', type=int, default=None,
+                        help="torch intra-op threads per worker (default: cores / workers)")
+    parser.add_argument('--request-threads', type=int, default=4,
+                        help="Concurrent requests per worker, so the micro-batcher can group them")
+    parser.add_argument('--timeout', type=int, default=120)
+    args = parser.parse_args()
+    
+    threads_per_worker = args.threads_per_worker or max(1, cpu_count // args.workers)
+    
+    # Keep the master single-threaded so no OpenMP pool exists at fork time
+    torch.set_num_threads(1)
+    
+    # Importing the server loads the model once in the master. Workers are
+    # forked afterwards and map the same shared-memory weights instead of each
+    # reading pose_detection_model.pth
+    from backend import server
+    model, _ = server.model_slot.get()
+    if model is None:
+        sys.exit("Model could not be loaded, refusing to start workers")
+    model.share_memory()
+    
+    options = {
+        'bind': args.bind,
+        'workers': args.workers,
+        'worker_class': 'gthread',
+        'threads': args.request_threads,
+        'timeout': args.timeout,
+        'preload_app': True,
+        'post_fork': make_post_fork(server, threads_per_worker)
+    }
+    # Streaming sessions live in one worker's memory, so streaming clients
+    # need a sticky load balancer in front of multiple workers. Background
+    # jobs are kept in JOB_DIR, so any worker answers for any job; with
+    # several hosts it must be a shared filesystem
+    PoseServer(server.app, options).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,176 @@
+import time
+IMPORT_START = time.perf_counter()  # Start of the startup-time report
 
-from flask import Flask, request, jsonify
+from flask import Flask, Request, request, jsonify, g, Response
 from flask_cors import CORS
 import torch
-import pandas as pd
 import numpy as np
 import os
-from werkzeug.utils import secure_filename
 import sys
+import io
+import json
+import struct
+import uuid
+import threading
+import tempfile
+
+try:
+    from flask_sock import Sock
+except ImportError:  # WebSocket streaming is optional
+    Sock = None
 
 # Add the parent directory to the path so we can import the LSTM model
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from backend.train_lstm_pose import LSTM_Model
+from backend.model import load_state_dict, model_from_state_dict
+from backend.scheduler import InferenceScheduler
+from backend.inference_backends import EagerBackend, TorchScriptBackend, OnnxBackend, verify_backend
+from backend.quantize_model import load_quantized_model, quantize_model
+from backend.metrics import Registry, Counter, Gauge, Histogram, StageTimer
+from backend.result_cache import ResultCache, file_version
+from backend.model_registry import (ModelSlot, RegistryWatcher, active_version, pinned_version,
+                                    list_versions, load_version, pin_version, CHECKPOINT_NAME)
+from backend.jobs import JobQueue, QueueFull
+from backend.preprocessing import PreprocessState, load_preprocessor
+from backend.sensors import SensorHub, HubFull
+from backend.keypoints import (NUM_KEYPOINTS, blend_keypoints, smooth_keypoints,
+                               flatten_keypoints, keypoints_to_points)
+
+class UploadRequest(Request):
+    # Werkzeug spools multipart files over 500KB to a temporary file on disk.
+    # Uploads are parsed straight into tensors, so keep them in memory; their
+    # size is bounded by MAX_UPLOAD_BYTES. Background jobs take recordings far
+    # larger than that, which are spooled to disk with their own limit
+    @property
+    def is_job_upload(self):
+        return self.method == 'POST' and self.path == '/jobs'
+    
+    @property
+    def max_content_length(self):
+        return JOB_MAX_UPLOAD_BYTES if self.is_job_upload else MAX_UPLOAD_BYTES
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.is_job_upload:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        return io.BytesIO()
 
 app = Flask(__name__)
+app.request_class = UploadRequest
 CORS(app)  # Enable CORS for all routes
+sock = Sock(app) if Sock is not None else None
 
 # Configuration
-UPLOAD_FOLDER = 'uploads'
-ALLOWED_EXTENSIONS = {'csv'}
+ALLOWED_EXTENSIONS = {'csv', 'bin', 'npy'}
 MODEL_PATH = 'pose_detection_model.pth'
+# Serving backend: 'eager', 'int8', 'torchscript', 'onnx' or 'student' (see
+# backend/quantize_model.py, backend/export_model.py and --teacher in
+# backend/train_lstm_pose.py)
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'eager')
+# Distilled model served by the 'student' backend; its architecture is read
+# from the weights
+STUDENT_MODEL_PATH = os.environ.get('STUDENT_MODEL_PATH', 'pose_detection_student.pth')
+QUANTIZED_MODEL_PATH = os.environ.get('QUANTIZED_MODEL_PATH', 'pose_detection_model_int8.pth')
+TORCHSCRIPT_PATH = os.environ.get('TORCHSCRIPT_PATH', 'pose_detection_model.ts')
+ONNX_PATH = os.environ.get('ONNX_PATH', 'pose_detection_model.onnx')
+# Compare a non-eager backend against the eager checkpoint at startup
+VERIFY_BACKEND = os.environ.get('VERIFY_BACKEND', '0') == '1'
+# Versioned model registry (backend/model_registry.py); when set, the eager and
+# int8 backends serve its active version and hot-swap when it changes
+MODEL_REGISTRY_DIR = os.environ.get('MODEL_REGISTRY_DIR', '')
+REGISTRY_POLL_SECONDS = float(os.environ.get('REGISTRY_POLL_SECONDS', 5))
 INPUT_SIZE = 30  # Number of subcarriers
+WINDOW_SIZE = 50  # Default rows per sliding window for /infer/batch
+WINDOW_STRIDE = 25  # Default rows between the starts of consecutive windows
+MAX_WINDOWS_PER_CHUNK = 256  # Windows per forward pass, bounds peak memory
+STREAM_MAX_CHUNK_ROWS = 256  # Maximum CSI frames accepted per streaming push
+STREAM_SESSION_TTL = 300  # Seconds before an idle streaming session is dropped
+STREAM_MAX_SESSIONS = 1024  # Upper bound on concurrently open streaming sessions
+MAX_UPLOAD_ROWS = 1_000_000  # Maximum CSI rows accepted per upload
+# Receptive-window policy for /infer, overridable per request with ?policy=:
+# 'full' runs every row, 'last' only the last INFER_WINDOW rows, and
+# 'chunked' carries the LSTM state through INFER_CHUNK_ROWS-row chunks
+INFER_POLICIES = ('full', 'last', 'chunked')
+INFER_POLICY = os.environ.get('INFER_POLICY', 'full')
+INFER_WINDOW = int(os.environ.get('INFER_WINDOW', 1000))
+INFER_CHUNK_ROWS = int(os.environ.get('INFER_CHUNK_ROWS', 4096))
+# Hard cap on the rows one /infer forward may run (the most recent ones); 0 disables
+INFER_MAX_ROWS = int(os.environ.get('INFER_MAX_ROWS', 0))
+MAX_UPLOAD_BYTES = 256 * 1024 * 1024  # Maximum request body size
+# Micro-batching of concurrent /infer requests, tunable from the environment
+BATCHING_ENABLED = os.environ.get('INFERENCE_BATCHING', '1') == '1'
+BATCH_MAX_SIZE = int(os.environ.get('INFERENCE_BATCH_MAX_SIZE', 32))
+BATCH_MAX_WAIT_MS = float(os.environ.get('INFERENCE_BATCH_MAX_WAIT_MS', 2.0))
+BATCH_BUCKET_WIDTH = int(os.environ.get('INFERENCE_BATCH_BUCKET_WIDTH', 64))
+# Add a Server-Timing header to every response (otherwise only with ?timing=1)
+SERVER_TIMING = os.environ.get('SERVER_TIMING', '0') == '1'
+# Cache of inference results for repeated uploads of the same capture
+RESULT_CACHE_ENABLED = os.environ.get('RESULT_CACHE', '1') == '1'
+RESULT_CACHE_MAX_MB = float(os.environ.get('RESULT_CACHE_MAX_MB', 64))
+RESULT_CACHE_TTL = float(os.environ.get('RESULT_CACHE_TTL', 3600))
+RESULT_CACHE_DIR = os.environ.get('RESULT_CACHE_DIR')  # Optional on-disk tier
+# Background analysis jobs for long recordings (/jobs)
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+JOB_MAX_PENDING = int(os.environ.get('JOB_MAX_PENDING', 8))  # Queued jobs before 503
+JOB_TTL = float(os.environ.get('JOB_TTL', 3600))  # Seconds finished jobs are kept
+# Job state, results and uploads, shared by all worker processes on the host
+JOB_DIR = os.environ.get('JOB_DIR', os.path.join(tempfile.gettempdir(), 'pose_jobs'))
+# Jobs stream their upload from disk, so they take far longer recordings than
+# /infer: 100M rows is over 11 days at 100 Hz
+JOB_MAX_UPLOAD_BYTES = int(os.environ.get('JOB_MAX_UPLOAD_MB', 16 * 1024)) * 1024 * 1024
+JOB_MAX_ROWS = int(os.environ.get('JOB_MAX_ROWS', 100_000_000))
+JOB_CHUNK_ROWS = int(os.environ.get('JOB_CHUNK_ROWS', 65536))  # Rows parsed and run per step
+# Multi-sensor fan-in: each tagged CSI link keeps its last FANIN_WINDOW rows,
+# and every FANIN_INTERVAL_MS one batched forward covers all links with new rows.
+# The buffers are per process, so all links of a site should reach the same worker
+FANIN_MAX_SENSORS = int(os.environ.get('FANIN_MAX_SENSORS', 512))
+FANIN_WINDOW = int(os.environ.get('FANIN_WINDOW', 50))
+FANIN_INTERVAL_MS = float(os.environ.get('FANIN_INTERVAL_MS', 200))
+FANIN_SENSOR_TTL = float(os.environ.get('FANIN_SENSOR_TTL', 60))  # Seconds before an idle link is dropped
+FANIN_MAX_PACKETS = 1024  # Sensor packets accepted per request
+
+# Binary uploads: magic, rows, subcarriers (little-endian), then float32 values
+BINARY_MAGIC = b'CSI1'
+BINARY_HEADER = struct.Struct('<4sII')
 
-# Create upload folder if it doesn't exist
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Flask rejects larger bodies with 413 before they are buffered (per request
+# through UploadRequest.max_content_length)
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
+
+# Metrics exposed at /metrics
+metrics = Registry()
+REQUEST_COUNT = metrics.register(Counter(
+    'pose_requests_total', 'Requests handled', ('endpoint', 'method', 'status')))
+ERROR_COUNT = metrics.register(Counter(
+    'pose_request_errors_total', 'Requests that ended with a 4xx or 5xx status', ('endpoint', 'status')))
+REQUEST_LATENCY = metrics.register(Histogram(
+    'pose_request_duration_seconds', 'End-to-end request latency', ('endpoint',)))
+STAGE_LATENCY = metrics.register(Histogram(
+    'pose_stage_duration_seconds', 'Latency of each inference pipeline stage', ('endpoint', 'stage')))
+IN_FLIGHT = metrics.register(Gauge(
+    'pose_requests_in_flight', 'Requests currently being handled'))
+MODEL_LOAD_SECONDS = metrics.register(Gauge(
+    'pose_model_load_seconds', 'Time taken to load the inference backend'))
+IMPORT_SECONDS = metrics.register(Gauge(
+    'pose_startup_import_seconds', 'Time taken to import the server and its dependencies'))
+WARM_UP_SECONDS = metrics.register(Gauge(
+    'pose_warm_up_seconds', 'Time taken by the warm-up forward passes in this process'))
+metrics.register(Gauge(
+    'pose_scheduler_queue_depth', 'Sequences waiting in the micro-batching queue',
+    function=lambda: scheduler.queue_depth() if scheduler is not None else 0))
+for job_status in ('queued', 'running'):
+    metrics.register(Gauge(
+        f'pose_jobs_{job_status}', f'Background analysis jobs {job_status}',
+        function=lambda status=job_status: job_queue.stats()[status]))
+for hub_stat in ('sensors', 'last_batch_size'):
+    metrics.register(Gauge(
+        f'pose_fanin_{hub_stat}', f'Sensor fan-in {hub_stat.replace("_", " ")}',
+        function=lambda stat=hub_stat: sensor_hub.stats()[stat]))
+metrics.register(Gauge(
+    'pose_fanin_step_seconds', 'Duration of the last batched sensor fan-in step',
+    function=lambda: sensor_hub.stats()['last_step_seconds']))
+for cache_stat in ('hits', 'disk_hits', 'misses', 'evictions', 'entries', 'bytes'):
+    metrics.register(Gauge(
+        f'pose_result_cache_{cache_stat}', f'Result cache {cache_stat.replace("_", " ")}',
+        function=lambda stat=cache_stat: result_cache.stats()[stat] if result_cache is not None else 0))
 
 # Map numerical predictions to pose classes
 POSE_CLASSES = ['Stand', 'Sit', 'Kneel', 'Sleep']
@@ -30,200 +178,1010 @@ POSE_CLASSES = ['Stand', 'Sit', 'Kneel', 'Sleep']
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def load_model():
+def load_eager_model(path=MODEL_PATH):
     # Check if model file exists
-    if not os.path.exists(MODEL_PATH):
-        print(f"Model file not found: {MODEL_PATH}")
+    if not os.path.exists(path):
+        print(f"Model file not found: {path}")
         return None
     
     try:
-        # Initialize model architecture
-        model = LSTM_Model(input_size=INPUT_SIZE, hidden_size=64, num_layers=2, num_classes=4)
-        # Load the saved weights
-        model.load_state_dict(torch.load(MODEL_PATH, map_location=torch.device('cpu')))
-        model.eval()
+        # Rebuild the architecture from the saved weights and load them
+        model = model_from_state_dict(load_state_dict(path))
         print("Model loaded successfully")
         return model
     except Exception as e:
         print(f"Error loading model: {str(e)}")
         return None
 
-def process_csv(file_path):
-    # Read and preprocess CSV data
+def load_model():
+    # Build the configured inference backend with the preprocessing it was
+    # trained with. Artifacts other than the student are derived from
+    # MODEL_PATH, so its stats apply
+    backend = build_backend()
+    if backend is not None:
+        backend.preprocessor = load_preprocessor(STUDENT_MODEL_PATH if INFERENCE_BACKEND == 'student'
+                                                 else MODEL_PATH)
+    return backend
+
+def build_backend():
+    if INFERENCE_BACKEND in ('eager', 'student'):
+        eager_model = load_eager_model(STUDENT_MODEL_PATH if INFERENCE_BACKEND == 'student' else MODEL_PATH)
+        return EagerBackend(eager_model, name=INFERENCE_BACKEND) if eager_model is not None else None
+    
+    try:
+        if INFERENCE_BACKEND == 'int8':
+            # Quantized weights are lossy, so accuracy is checked offline with
+            # validate_lstm_pose.py --compare-int8 rather than verify_backend
+            backend = EagerBackend(load_quantized_model(QUANTIZED_MODEL_PATH), name='int8')
+            print(f"{backend.name} backend loaded successfully")
+            return backend
+        elif INFERENCE_BACKEND == 'torchscript':
+            backend = TorchScriptBackend(TORCHSCRIPT_PATH)
+        elif INFERENCE_BACKEND == 'onnx':
+            backend = OnnxBackend(ONNX_PATH, num_threads=torch.get_num_threads())
+        else:
+            print(f"Unknown inference backend: {INFERENCE_BACKEND}")
+            return None
+        
+        if VERIFY_BACKEND:
+            reference = load_eager_model()
+            if reference is not None:
+                diff = verify_backend(backend, reference, INPUT_SIZE)
+                print(f"{backend.name} backend matches eager model (max abs diff {diff:.2e})")
+        
+        print(f"{backend.name} backend loaded successfully")
+        return backend
+    except Exception as e:
+        print(f"Error loading {INFERENCE_BACKEND} backend: {str(e)}")
+        return None
+
+def model_artifact_path():
+    # File the configured backend is loaded from
+    return {
+        'eager': MODEL_PATH,
+        'student': STUDENT_MODEL_PATH,
+        'int8': QUANTIZED_MODEL_PATH,
+        'torchscript': TORCHSCRIPT_PATH,
+        'onnx': ONNX_PATH
+    }.get(INFERENCE_BACKEND)
+
+def registry_enabled():
+    return bool(MODEL_REGISTRY_DIR) and INFERENCE_BACKEND in ('eager', 'int8')
+
+def activate_version(version, warm=True):
+    # Load a registry version in the calling (background) thread, warm it up
+    # and swap it in. Requests that already hold the old model finish on it
+    with reload_lock:
+        if model_slot.get()[1] == version:
+            return
+        eager_model, metadata = load_version(MODEL_REGISTRY_DIR, version)
+        if INFERENCE_BACKEND == 'int8':
+            new_model = EagerBackend(quantize_model(eager_model), name='int8')
+        else:
+            new_model = EagerBackend(eager_model)
+        new_model.preprocessor = load_preprocessor(os.path.join(MODEL_REGISTRY_DIR, version, CHECKPOINT_NAME))
+        if warm:
+            warm_up_model(new_model)
+        model_slot.swap(new_model, version)
+        print(f"Serving model version {version}")
+
+def start_model_watcher():
+    # Called once per serving process, after any fork
+    if registry_watcher is not None:
+        registry_watcher.start()
+
+def warm_up_model(model):
+    # Run the shapes /infer and /infer/batch use once so allocator and kernel
+    # setup happen before the first real request
+    with torch.no_grad():
+        model(torch.zeros(WINDOW_SIZE, INPUT_SIZE))
+        model(torch.zeros(8, WINDOW_SIZE, INPUT_SIZE))
+
+def warm_up():
+    # Warm up the serving model in this process, then report ready
+    model, _ = model_slot.get()
+    if model is None:
+        return
+    start = time.perf_counter()
+    warm_up_model(model)
+    startup_timings['warm_up_seconds'] = time.perf_counter() - start
+    WARM_UP_SECONDS.set(startup_timings['warm_up_seconds'])
+    ready.set()
+    print("Startup: " + ', '.join(f"{name.replace('_seconds', '')} {seconds * 1000:.0f} ms"
+                                  for name, seconds in startup_timings.items()))
+
+def supports_streaming(backend):
+    # Streaming needs access to the LSTM state, which only the eager model exposes
+    return backend is not None and hasattr(backend, 'forward_stateful')
+
+def preprocess_features(model, features, state=None):
+    # Apply the model's preprocessing to raw [rows, INPUT_SIZE] CSI. Passing
+    # the returned state back in continues the filters across chunks of one
+    # recording or stream. Models trained on raw CSI get features unchanged
+    if model.preprocessor is None:
+        return features, state
+    state = state if state is not None else PreprocessState()
+    return torch.from_numpy(model.preprocessor(features.numpy(), state)), state
+
+def process_csv(source):
+    # Read CSV data from a path or file-like object (e.g. the request stream).
+    # pandas is imported on first use; binary uploads never need it, and it
+    # is one of the slowest imports at startup
+    import pandas as pd
     try:
-        df = pd.read_csv(file_path)
-        # Extract features (assuming the CSV has the same format as training data)
-        # Use the first 30 columns (subcarrier data)
-        features = df.iloc[:, :INPUT_SIZE].values
+        # Only parse the first 30 columns (subcarrier data), straight to float32.
+        # One extra row is read so the caller can detect uploads over the limit
+        df = pd.read_csv(source, usecols=range(INPUT_SIZE), dtype=np.float32,
+                         nrows=MAX_UPLOAD_ROWS + 1)
         
-        # Convert to tensor
-        features_tensor = torch.FloatTensor(features)
-        return features_tensor
+        # Convert to tensor without another copy
+        return torch.from_numpy(np.ascontiguousarray(df.values))
     except Exception as e:
         print(f"Error processing CSV: {str(e)}")
         return None
 
-def generate_keypoints(pose):
-    # Generate keypoints based on the predicted pose
-    # This uses the same logic as in the frontend mock
-    if pose == "Stand":
-        return [
-            {"x": 0.5, "y": 0.1},  # Head
-            {"x": 0.5, "y": 0.2},  # Neck
-            {"x": 0.5, "y": 0.3},  # Spine
-            {"x": 0.5, "y": 0.45},  # Pelvis
-            {"x": 0.5, "y": 0.5},  # Tailbone
-            {"x": 0.6, "y": 0.2},  # Right shoulder
-            {"x": 0.65, "y": 0.35},  # Right elbow
-            {"x": 0.4, "y": 0.2},  # Left shoulder
-            {"x": 0.35, "y": 0.35},  # Left elbow
-            {"x": 0.7, "y": 0.5},  # Right hand
-            {"x": 0.7, "y": 0.5},  # Right fingers
-            {"x": 0.3, "y": 0.5},  # Left hand
-            {"x": 0.3, "y": 0.5},  # Left fingers
-            {"x": 0.55, "y": 0.6},  # Right hip
-            {"x": 0.55, "y": 0.75},  # Right knee
-            {"x": 0.55, "y": 0.9},  # Right ankle
-            {"x": 0.45, "y": 0.6},  # Left hip
-            {"x": 0.45, "y": 0.75},  # Left knee
-            {"x": 0.45, "y": 0.9}  # Left ankle
-        ]
-    elif pose == "Sit":
-        return [
-            {"x": 0.5, "y": 0.2},  # Head
-            {"x": 0.5, "y": 0.3},  # Neck
-            {"x": 0.5, "y": 0.4},  # Spine
-            {"x": 0.5, "y": 0.5},  # Pelvis
-            {"x": 0.5, "y": 0.5},  # Tailbone
-            {"x": 0.6, "y": 0.3},  # Right shoulder
-            {"x": 0.65, "y": 0.4},  # Right elbow
-            {"x": 0.4, "y": 0.3},  # Left shoulder
-            {"x": 0.35, "y": 0.4},  # Left elbow
-            {"x": 0.7, "y": 0.5},  # Right hand
-            {"x": 0.7, "y": 0.5},  # Right fingers
-            {"x": 0.3, "y": 0.5},  # Left hand
-            {"x": 0.3, "y": 0.5},  # Left fingers
-            {"x": 0.55, "y": 0.5},  # Right hip
-            {"x": 0.6, "y": 0.7},  # Right knee
-            {"x": 0.5, "y": 0.9},  # Right ankle
-            {"x": 0.45, "y": 0.5},  # Left hip
-            {"x": 0.4, "y": 0.7},  # Left knee
-            {"x": 0.5, "y": 0.9}  # Left ankle
-        ]
-    elif pose == "Kneel":
-        return [
-            {"x": 0.5, "y": 0.2},  # Head
-            {"x": 0.5, "y": 0.3},  # Neck
-            {"x": 0.5, "y": 0.4},  # Spine
-            {"x": 0.5, "y": 0.5},  # Pelvis
-            {"x": 0.5, "y": 0.55},  # Tailbone
-            {"x": 0.6, "y": 0.3},  # Right shoulder
-            {"x": 0.7, "y": 0.4},  # Right elbow
-            {"x": 0.4, "y": 0.3},  # Left shoulder
-            {"x": 0.3, "y": 0.4},  # Left elbow
-            {"x": 0.75, "y": 0.5},  # Right hand
-            {"x": 0.8, "y": 0.5},  # Right fingers
-            {"x": 0.25, "y": 0.5},  # Left hand
-            {"x": 0.2, "y": 0.5},  # Left fingers
-            {"x": 0.55, "y": 0.55},  # Right hip
-            {"x": 0.55, "y": 0.75},  # Right knee
-            {"x": 0.7, "y": 0.9},  # Right ankle
-            {"x": 0.45, "y": 0.55},  # Left hip
-            {"x": 0.45, "y": 0.75},  # Left knee
-            {"x": 0.3, "y": 0.9}  # Left ankle
-        ]
-    elif pose == "Sleep":
-        return [
-            {"x": 0.1, "y": 0.5},  # Head
-            {"x": 0.2, "y": 0.5},  # Neck
-            {"x": 0.4, "y": 0.5},  # Spine
-            {"x": 0.6, "y": 0.5},  # Pelvis
-            {"x": 0.7, "y": 0.5},  # Tailbone
-            {"x": 0.2, "y": 0.4},  # Right shoulder
-            {"x": 0.3, "y": 0.35},  # Right elbow
-            {"x": 0.2, "y": 0.6},  # Left shoulder
-            {"x": 0.3, "y": 0.65},  # Left elbow
-            {"x": 0.4, "y": 0.3},  # Right hand
-            {"x": 0.45, "y": 0.25},  # Right fingers
-            {"x": 0.4, "y": 0.7},  # Left hand
-            {"x": 0.45, "y": 0.75},  # Left fingers
-            {"x": 0.6, "y": 0.45},  # Right hip
-            {"x": 0.75, "y": 0.4},  # Right knee
-            {"x": 0.9, "y": 0.4},  # Right ankle
-            {"x": 0.6, "y": 0.55},  # Left hip
-            {"x": 0.75, "y": 0.6},  # Left knee
-            {"x": 0.9, "y": 0.6}  # Left ankle
-        ]
-    else:
-        # Default skeleton
-        return [{"x": 0.5, "y": 0.5} for _ in range(19)]
+def read_binary_header(data, size, max_rows):
+    # (rows, subcarriers) from the header of a binary upload of size bytes
+    if len(data) < BINARY_HEADER.size:
+        raise ValueError('Binary payload is missing its header')
+    
+    magic, rows, subcarriers = BINARY_HEADER.unpack_from(data)
+    if magic != BINARY_MAGIC:
+        raise ValueError('Binary payload has an unknown header')
+    if subcarriers < INPUT_SIZE:
+        raise ValueError(f'Binary payload needs at least {INPUT_SIZE} subcarriers')
+    if rows > max_rows:
+        raise ValueError(f'Upload exceeds {max_rows} rows')
+    if size != BINARY_HEADER.size + rows * subcarriers * 4:
+        raise ValueError('Binary payload size does not match its header')
+    return rows, subcarriers
 
-# Load model when the server starts
-model = load_model()
+def process_binary(data):
+    # Decode a binary upload zero-copy. data must be writable (bytearray) so
+    # torch.from_numpy can share the buffer
+    rows, subcarriers = read_binary_header(data, len(data), MAX_UPLOAD_ROWS)
+    
+    features = np.frombuffer(data, dtype='<f4', count=rows * subcarriers,
+                             offset=BINARY_HEADER.size).reshape(rows, subcarriers)
+    return torch.from_numpy(features[:, :INPUT_SIZE])
 
-@app.route('/infer', methods=['POST'])
-def infer():
+def request_upload_file():
+    # The uploaded multipart file, after the client-facing checks
     # Check if file was included in the request
     if 'file' not in request.files:
-        return jsonify({'error': 'No file provided'}), 400
+        raise ValueError('No file provided')
     
     file = request.files['file']
     
     if file.filename == '':
-        return jsonify({'error': 'No file selected'}), 400
-    
-    if file and allowed_file(file.filename):
-        try:
-            # Save uploaded file
-            filename = secure_filename(file.filename)
-            file_path = os.path.join(UPLOAD_FOLDER, filename)
-            file.save(file_path)
-            
-            # Check if model is loaded
-            if model is None:
-                return jsonify({'error': 'Model not loaded'}), 500
-            
-            # Process CSV
-            features = process_csv(file_path)
-            if features is None:
-                return jsonify({'error': 'Failed to process CSV file'}), 500
+        raise ValueError('No file selected')
+    
+    if not allowed_file(file.filename):
+        raise ValueError('Invalid file type')
+    return file
+
+def process_npy(data):
+    # Decode an uploaded .npy array of [rows, >= INPUT_SIZE] values. The header
+    # is parsed with numpy's format helpers and float32 data is used in place
+    buffer = io.BytesIO(data)
+    try:
+        version = np.lib.format.read_magic(buffer)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(buffer)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(buffer)
+    except ValueError:
+        raise ValueError('Upload is not a valid .npy array')
+    if dtype.hasobject or dtype.kind not in 'fiu':
+        raise ValueError('.npy upload must hold numeric values')
+    if len(shape) != 2 or shape[1] < INPUT_SIZE:
+        raise ValueError(f'.npy upload must be [rows, {INPUT_SIZE}+] shaped')
+    if shape[0] > MAX_UPLOAD_ROWS:
+        raise ValueError(f'Upload exceeds {MAX_UPLOAD_ROWS} rows')
+    if len(data) - buffer.tell() != shape[0] * shape[1] * dtype.itemsize:
+        raise ValueError('.npy payload size does not match its header')
+    
+    values = np.frombuffer(data, dtype=dtype, count=shape[0] * shape[1], offset=buffer.tell())
+    values = values.reshape(shape, order='F' if fortran_order else 'C')[:, :INPUT_SIZE]
+    if values.dtype != np.float32:
+        values = values.astype(np.float32)
+    return torch.from_numpy(values)
+
+def upload_kind(filename):
+    # 'bin', 'npy' or 'csv' from an already allowed filename
+    return filename.rsplit('.', 1)[1].lower()
+
+def read_upload_features():
+    # Parse the request body in memory into a [rows, INPUT_SIZE] float32 tensor:
+    # a raw binary or text/csv body, or a multipart 'file' field. Raises
+    # ValueError with a client-facing message for bad uploads
+    if request.mimetype == 'application/octet-stream':
+        features = process_binary(bytearray(request.get_data(cache=False)))
+        if features.size(0) == 0:
+            raise ValueError('Upload contains no CSI rows')
+        return features
+    if request.mimetype == 'text/csv':
+        features = process_csv(request.stream)
+        if features is None:
+            raise ValueError('Failed to process CSV body')
+        if features.size(0) > MAX_UPLOAD_ROWS:
+            raise ValueError(f'Upload exceeds {MAX_UPLOAD_ROWS} rows')
+        if features.size(0) == 0:
+            raise ValueError('Upload contains no CSI rows')
+        return features
+    
+    file = request_upload_file()
+    kind = upload_kind(file.filename)
+    if kind == 'bin':
+        features = process_binary(bytearray(file.read()))
+    elif kind == 'npy':
+        features = process_npy(bytearray(file.read()))
+    else:
+        features = process_csv(file.stream)
+        if features is None:
+            raise ValueError('Failed to process CSV file')
+        if features.size(0) > MAX_UPLOAD_ROWS:
+            raise ValueError(f'Upload exceeds {MAX_UPLOAD_ROWS} rows')
+    
+    if features.size(0) == 0:
+        raise ValueError('Upload contains no CSI rows')
+    return features
+
+def spool_job_upload():
+    # Copy a job's upload (raw body or multipart 'file') to a file in the job
+    # store without holding it in memory. Returns (path, format)
+    if request.mimetype in ('application/octet-stream', 'text/csv'):
+        stream, kind = request.stream, 'bin' if request.mimetype == 'application/octet-stream' else 'csv'
+    else:
+        file = request_upload_file()
+        stream, kind = file.stream, upload_kind(file.filename)
+    return job_queue.spool(stream), kind
+
+def open_upload_array(path, kind):
+    # Memory-map a spooled .bin or .npy upload as [rows, subcarriers]
+    if kind == 'bin':
+        with open(path, 'rb') as f:
+            header = f.read(BINARY_HEADER.size)
+        shape = read_binary_header(header, os.path.getsize(path), JOB_MAX_ROWS)
+        if shape[0] == 0:
+            raise ValueError('Upload contains no CSI rows')
+        return np.memmap(path, dtype='<f4', mode='r', offset=BINARY_HEADER.size, shape=shape)
+    
+    try:
+        values = np.load(path, mmap_mode='r')
+    except ValueError:
+        raise ValueError('Upload is not a valid .npy array')
+    if values.dtype.kind not in 'fiu':
+        raise ValueError('.npy upload must hold numeric values')
+    if values.ndim != 2 or values.shape[1] < INPUT_SIZE:
+        raise ValueError(f'.npy upload must be [rows, {INPUT_SIZE}+] shaped')
+    if values.shape[0] > JOB_MAX_ROWS:
+        raise ValueError(f'Upload exceeds {JOB_MAX_ROWS} rows')
+    return values
+
+def iter_upload_blocks(path, kind, block_rows):
+    # Yield ([rows, INPUT_SIZE] tensor, estimated total rows) blocks of a
+    # spooled upload, reading only one block into memory at a time
+    if kind in ('bin', 'npy'):
+        values = open_upload_array(path, kind)
+        for start in range(0, values.shape[0], block_rows):
+            block = np.ascontiguousarray(values[start:start + block_rows, :INPUT_SIZE], dtype=np.float32)
+            yield torch.from_numpy(block), values.shape[0]
+        return
+    
+    import pandas as pd
+    with open(path, 'rb') as f:
+        total_rows = max(sum(block.count(b'\n') for block in iter(lambda: f.read(1 << 20), b'')) - 1, 1)
+    rows_read = 0
+    for chunk in pd.read_csv(path, usecols=range(INPUT_SIZE), dtype=np.float32, chunksize=block_rows):
+        rows_read += len(chunk)
+        if rows_read > JOB_MAX_ROWS:
+            raise ValueError(f'Upload exceeds {JOB_MAX_ROWS} rows')
+        yield torch.from_numpy(np.ascontiguousarray(chunk.values)), total_rows
+
+def read_window_params():
+    # Sliding-window seq_len and stride from the form or the query string
+    seq_len = request.values.get('seq_len', WINDOW_SIZE, type=int)
+    stride = request.values.get('stride', WINDOW_STRIDE, type=int)
+    if seq_len is None or stride is None or seq_len <= 0 or stride <= 0:
+        raise ValueError('seq_len and stride must be positive integers')
+    return seq_len, stride
+
+def read_infer_policy():
+    # (policy, window, chunk_rows) from the request, defaulting to the server config
+    policy = request.values.get('policy', INFER_POLICY)
+    window = request.values.get('window', INFER_WINDOW, type=int)
+    chunk_rows = request.values.get('chunk', INFER_CHUNK_ROWS, type=int)
+    if policy not in INFER_POLICIES:
+        raise ValueError(f"policy must be one of {', '.join(INFER_POLICIES)}")
+    if window is None or chunk_rows is None or window <= 0 or chunk_rows <= 0:
+        raise ValueError('window and chunk must be positive integers')
+    return policy, window, chunk_rows
+
+def limit_rows(features, policy, window):
+    # The prediction is decoded from the final time step, so the most recent
+    # rows are the ones kept when a window or INFER_MAX_ROWS applies
+    rows = window if policy == 'last' else features.size(0)
+    if INFER_MAX_ROWS:
+        rows = min(rows, INFER_MAX_ROWS)
+    return features[-rows:] if rows < features.size(0) else features
+
+def forward_chunked(model, features, chunk_rows):
+    # Run a long recording chunk by chunk, carrying (h, c) between chunks, so
+    # peak activation memory is bounded by chunk_rows
+    state = None
+    for start in range(0, features.size(0), chunk_rows):
+        presence_pred, pose_logits, state = model.forward_stateful(features[start:start + chunk_rows], state)
+    return presence_pred, pose_logits
+
+def make_windows(features, seq_len, stride):
+    # Slice [rows, features] into overlapping [N, seq_len, features] windows.
+    # unfold returns a strided view, so rows are only copied chunk by chunk
+    if features.size(0) < seq_len:
+        return None
+    return features.unfold(0, seq_len, stride).transpose(1, 2)
+
+def predict_windows(model, windows, chunk_size=MAX_WINDOWS_PER_CHUNK):
+    # Run the model over the windows in fixed-size chunks to keep memory bounded
+    presence_chunks = []
+    confidence_chunks = []
+    with torch.no_grad():
+        for start in range(0, windows.size(0), chunk_size):
+            chunk = windows[start:start + chunk_size].contiguous()
+            presence_pred, pose_logits = model(chunk)
+            presence_chunks.append(presence_pred)
+            confidence_chunks.append(torch.nn.functional.softmax(pose_logits, dim=1))
+    return torch.cat(presence_chunks), torch.cat(confidence_chunks)
+
+def run_analysis_job(job, kind, seq_len, stride, model, model_version):
+    # Sliding-window timeline of a long recording, computed block by block so
+    # results appear as the job progresses. Windows start at multiples of
+    # stride across the whole recording; rows not yet covered by a complete
+    # window are carried into the next block
+    buffer = torch.empty(0, INPUT_SIZE)
+    offset = 0  # Recording row at which buffer starts
+    skip = 0  # Rows to drop from the next block when stride > seq_len
+    rows_read = 0
+    pose_counts = [0] * len(POSE_CLASSES)
+    num_windows = 0
+    preprocess_state = None
+    
+    for block, total_rows in iter_upload_blocks(job.payload_path, kind, JOB_CHUNK_ROWS):
+        if job.cancelled:
+            return None
+        rows_read += block.size(0)
+        block, preprocess_state = preprocess_features(model, block, preprocess_state)
+        dropped = min(skip, block.size(0))
+        skip -= dropped
+        buffer = torch.cat([buffer, block[dropped:]])
+        
+        rows = []
+        windows = make_windows(buffer, seq_len, stride)
+        if windows is not None:
+            presence, confidences = predict_windows(model, windows)
+            pose_idx = confidences.argmax(dim=1).tolist()
+            for i, (score, idx, confidence) in enumerate(zip(presence.tolist(), pose_idx,
+                                                             confidences.tolist())):
+                rows.append({
+                    'window_start': offset + i * stride,
+                    'human_present': score > 0.5,
+                    'presence_score': score,
+                    'pose_class': POSE_CLASSES[idx],
+                    'confidence': confidence
+                })
+                pose_counts[idx] += 1
+            num_windows += len(pose_idx)
             
-            # Make prediction
-            with torch.no_grad():
+            consumed = len(pose_idx) * stride
+            skip = max(consumed - buffer.size(0), 0)
+            buffer = buffer[consumed:]
+            offset += consumed
+        job.append(rows, min(rows_read / total_rows, 0.99))
+    
+    if num_windows == 0:
+        raise ValueError(f'Recording has fewer than seq_len={seq_len} rows')
+    return {
+        'rows': rows_read,
+        'num_windows': num_windows,
+        'seq_len': seq_len,
+        'stride': stride,
+        'pose_counts': dict(zip(POSE_CLASSES, pose_counts)),
+        'model_version': model_version
+    }
+
+class StreamSession:
+    # LSTM (h, c) and preprocessing filter state carried between pushes of a
+    # single live CSI stream. The session keeps the model it started on,
+    # since the state is tied to it
+    def __init__(self, model, model_version):
+        self.model = model
+        self.model_version = model_version
+        self.state = None
+        self.preprocess_state = None
+        self.frames_seen = 0
+        self.last_seen = time.monotonic()
+        self.lock = threading.Lock()
+
+stream_sessions = {}
+stream_sessions_lock = threading.Lock()
+
+def expire_stream_sessions():
+    # Drop sessions that have not pushed frames within STREAM_SESSION_TTL
+    now = time.monotonic()
+    with stream_sessions_lock:
+        expired = [sid for sid, session in stream_sessions.items()
+                   if now - session.last_seen > STREAM_SESSION_TTL]
+        for sid in expired:
+            del stream_sessions[sid]
+
+def get_stream_session(session_id, close=False):
+    # The session, or None if it is unknown or idle past STREAM_SESSION_TTL.
+    # expire_stream_sessions only runs when a session is opened, so expired
+    # sessions are dropped here as well. close removes the session
+    with stream_sessions_lock:
+        session = stream_sessions.get(session_id)
+        if session is None:
+            return None
+        expired = time.monotonic() - session.last_seen > STREAM_SESSION_TTL
+        if expired or close:
+            del stream_sessions[session_id]
+    return None if expired else session
+
+def create_stream_session(model, model_version):
+    expire_stream_sessions()
+    with stream_sessions_lock:
+        if len(stream_sessions) >= STREAM_MAX_SESSIONS:
+            return None
+        session_id = uuid.uuid4().hex
+        stream_sessions[session_id] = StreamSession(model, model_version)
+    return session_id
+
+def parse_stream_frames(frames):
+    # Accept a single frame or a list of frames, each with INPUT_SIZE values
+    frames = torch.tensor(frames, dtype=torch.float32)
+    if frames.dim() == 1:
+        frames = frames.unsqueeze(0)
+    if frames.dim() != 2 or frames.size(1) != INPUT_SIZE:
+        raise ValueError(f'Frames must have {INPUT_SIZE} subcarrier values each')
+    if frames.size(0) == 0 or frames.size(0) > STREAM_MAX_CHUNK_ROWS:
+        raise ValueError(f'Push between 1 and {STREAM_MAX_CHUNK_ROWS} frames at a time')
+    return frames
+
+def advance_stream(session, frames):
+    # Feed only the new frames through the LSTM, starting from the session state
+    with session.lock:
+        frames, session.preprocess_state = preprocess_features(session.model, frames,
+                                                               session.preprocess_state)
+        with torch.no_grad():
+            presence_pred, pose_logits, session.state = session.model.forward_stateful(frames, session.state)
+        session.frames_seen += frames.size(0)
+        session.last_seen = time.monotonic()
+        frames_seen = session.frames_seen
+    
+    confidences = torch.nn.functional.softmax(pose_logits, dim=1)[0].tolist()
+    pose_idx = int(torch.argmax(pose_logits, dim=1)[0].item())
+    return {
+        'human_present': bool(presence_pred[0].item() > 0.5),
+        'pose_class': POSE_CLASSES[pose_idx],
+        'confidence': {POSE_CLASSES[i]: confidences[i] for i in range(len(POSE_CLASSES))},
+        'frames_seen': frames_seen,
+        'model_version': session.model_version
+    }
+
+def run_fanin_step():
+    # One batched forward over every sensor window with new rows; called by
+    # the hub's background thread every FANIN_INTERVAL_MS
+    model, model_version = model_slot.get()
+    if model is None:
+        return
+    
+    def predict(windows):
+        presence, confidences = predict_windows(model, torch.from_numpy(windows),
+                                                chunk_size=FANIN_MAX_SENSORS)
+        return presence.numpy(), confidences.numpy()
+    
+    sensor_hub.step(predict, model_version)
+
+def parse_sensor_packets(payload):
+    # {"sensor_id": ..., "room": ..., "frames": [...]} or {"packets": [those]}
+    packets = payload.get('packets', [payload]) if isinstance(payload, dict) else None
+    if not isinstance(packets, list) or not packets:
+        raise ValueError('Provide sensor_id and frames, or a list of packets')
+    if len(packets) > FANIN_MAX_PACKETS:
+        raise ValueError(f'Push at most {FANIN_MAX_PACKETS} packets at a time')
+    parsed = []
+    for packet in packets:
+        if not isinstance(packet, dict) or 'frames' not in packet:
+            raise ValueError('Every packet needs frames')
+        sensor_id, room = packet.get('sensor_id'), packet.get('room', 'default')
+        if not isinstance(sensor_id, str) or not sensor_id or not isinstance(room, str):
+            raise ValueError('sensor_id and room must be non-empty strings')
+        parsed.append((sensor_id, room, parse_stream_frames(packet['frames']).numpy()))
+    return parsed
+
+# Set by warm_up(); /ready reports 503 until then
+ready = threading.Event()
+
+# The serving (model, version) pair; routes read it once per request
+model_slot = ModelSlot()
+reload_lock = threading.Lock()
+registry_watcher = None
+
+# Import, model load and warm-up durations, reported by warm_up() and /ready
+startup_timings = {'import_seconds': time.perf_counter() - IMPORT_START}
+IMPORT_SECONDS.set(startup_timings['import_seconds'])
+
+# Load model when the server starts
+load_start = time.perf_counter()
+if registry_enabled():
+    initial_version = active_version(MODEL_REGISTRY_DIR)
+    if initial_version is not None:
+        activate_version(initial_version, warm=False)
+    else:
+        print(f"No model versions found in registry: {MODEL_REGISTRY_DIR}")
+    registry_watcher = RegistryWatcher(MODEL_REGISTRY_DIR, model_slot, activate_version,
+                                       poll_seconds=REGISTRY_POLL_SECONDS)
+else:
+    loaded_model = load_model()
+    if loaded_model is not None:
+        # Without a registry the version is a content hash of the artifact, so
+        # replacing the checkpoint still invalidates cached results
+        model_slot.swap(loaded_model, file_version(model_artifact_path()))
+startup_timings['model_load_seconds'] = time.perf_counter() - load_start
+MODEL_LOAD_SECONDS.set(startup_timings['model_load_seconds'])
+
+# Cached results are keyed by backend and model version, so a new model never
+# serves stale entries, including those in the on-disk tier
+result_cache = None
+if RESULT_CACHE_ENABLED:
+    result_cache = ResultCache(max_bytes=int(RESULT_CACHE_MAX_MB * 1024 * 1024),
+                               ttl=RESULT_CACHE_TTL, disk_dir=RESULT_CACHE_DIR)
+
+# Long recordings are analysed in the background, off the request threads
+job_queue = JobQueue(JOB_DIR, workers=JOB_WORKERS, max_pending=JOB_MAX_PENDING, ttl=JOB_TTL)
+
+# Ring buffers and latest results of the tagged CSI links pushed to /sensors/frames
+sensor_hub = SensorHub(max_sensors=FANIN_MAX_SENSORS, window=FANIN_WINDOW, num_features=INPUT_SIZE,
+                       num_classes=len(POSE_CLASSES), sensor_ttl=FANIN_SENSOR_TTL)
+
+# Concurrent /infer requests share batched forward passes through the scheduler
+scheduler = None
+if BATCHING_ENABLED:
+    scheduler = InferenceScheduler(max_batch_size=BATCH_MAX_SIZE,
+                                   max_wait_ms=BATCH_MAX_WAIT_MS,
+                                   bucket_width=BATCH_BUCKET_WIDTH)
+
+@app.before_request
+def start_request_metrics():
+    g.request_start = time.perf_counter()
+    g.timer = StageTimer(STAGE_LATENCY, request.endpoint or 'unknown')
+    IN_FLIGHT.inc()
+    g.in_flight = True
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.endpoint or 'unknown'
+    elapsed = time.perf_counter() - g.request_start
+    REQUEST_COUNT.inc(endpoint, request.method, str(response.status_code))
+    if response.status_code >= 400:
+        ERROR_COUNT.inc(endpoint, str(response.status_code))
+    REQUEST_LATENCY.observe(elapsed, endpoint)
+    
+    if SERVER_TIMING or request.args.get('timing') == '1':
+        stages = g.timer.server_timing()
+        total = f'total;dur={elapsed * 1000:.3f}'
+        response.headers['Server-Timing'] = f'{stages}, {total}' if stages else total
+    return response
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    if g.pop('in_flight', False):
+        IN_FLIGHT.dec()
+
+@app.route('/ready', methods=['GET'])
+def readiness():
+    # Healthy only once the model is loaded and warmed up in this process
+    model, model_version = model_slot.get()
+    if not ready.is_set() or model is None:
+        return jsonify({'ready': False}), 503
+    return jsonify({'ready': True, 'backend': model.name, 'model_version': model_version,
+                    'startup': startup_timings})
+
+@app.route('/models', methods=['GET'])
+def list_models():
+    model, model_version = model_slot.get()
+    if not registry_enabled():
+        return jsonify({'registry': None, 'serving': model_version, 'versions': []})
+    return jsonify({
+        'registry': MODEL_REGISTRY_DIR,
+        'serving': model_version,
+        'active': active_version(MODEL_REGISTRY_DIR),
+        'pinned': pinned_version(MODEL_REGISTRY_DIR),
+        'versions': list_versions(MODEL_REGISTRY_DIR)
+    })
+
+@app.route('/models/rollback', methods=['POST'])
+def rollback_model():
+    # Pin a version: {"version": "v0003"}, {"version": "latest"} to follow the
+    # newest again, or no body to go back one version from the serving one
+    if not registry_enabled():
+        return jsonify({'error': 'Model registry is not configured'}), 400
+    
+    payload = request.get_json(silent=True) or {}
+    target = payload.get('version')
+    if target is None:
+        versions = [v['version'] for v in list_versions(MODEL_REGISTRY_DIR)]
+        current = model_slot.get()[1]
+        if current not in versions or versions.index(current) == 0:
+            return jsonify({'error': 'No earlier version to roll back to'}), 409
+        target = versions[versions.index(current) - 1]
+    
+    try:
+        # The pin lives in the registry so every worker process converges on it
+        pin_version(MODEL_REGISTRY_DIR, None if target == 'latest' else target)
+        activate_version(active_version(MODEL_REGISTRY_DIR))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    return jsonify({'model_version': model_slot.get()[1], 'pinned': pinned_version(MODEL_REGISTRY_DIR)})
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/infer', methods=['POST'])
+def infer():
+    timer = g.timer
+    try:
+        # Reading form values parses a multipart body, so it is timed as parse
+        with timer.stage('parse'):
+            features = read_upload_features()
+            policy, window, chunk_rows = read_infer_policy()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Check if model is loaded
+    model, model_version = model_slot.get()
+    if model is None:
+        return jsonify({'error': 'Model not loaded'}), 500
+    
+    features = limit_rows(features, policy, window)
+    # Chunking needs the LSTM state, otherwise the recording runs in one pass
+    chunked = policy == 'chunked' and supports_streaming(model) and features.size(0) > chunk_rows
+    
+    try:
+        if result_cache is not None:
+            with timer.stage('cache'):
+                cache_key = ResultCache.key(f"{model.name}-{model_version}", 'infer', features,
+                                            (chunk_rows,) if chunked else ())
+                cached = result_cache.get(cache_key)
+            if cached is not None:
+                return jsonify(cached)
+        
+        with timer.stage('preprocess'):
+            features, _ = preprocess_features(model, features)
+        
+        # Make prediction (includes the micro-batching queue wait when enabled)
+        with torch.no_grad(), timer.stage('forward'):
+            if chunked:
+                presence_pred, pose_logits = forward_chunked(model, features, chunk_rows)
+            elif scheduler is not None:
+                presence_pred, pose_logits = scheduler.infer(features, model)
+            else:
                 presence_pred, pose_logits = model(features)
-                
-                # Get the most likely pose class
-                _, predicted_pose_idx = torch.max(pose_logits, 1)
-                pose_idx = predicted_pose_idx[0].item()
-                
-                # Map numerical prediction to pose class name
-                predicted_pose = POSE_CLASSES[pose_idx]
-                
-                # Convert presence prediction to boolean
-                human_present = bool(presence_pred[0].item() > 0.5)
-                
-                # Calculate confidence scores for each pose
-                confidences = torch.nn.functional.softmax(pose_logits, dim=1)[0].tolist()
-                confidence_dict = {POSE_CLASSES[i]: confidences[i] for i in range(len(POSE_CLASSES))}
+        
+        with timer.stage('postprocess'):
+            # Get the most likely pose class
+            _, predicted_pose_idx = torch.max(pose_logits, 1)
+            pose_idx = predicted_pose_idx[0].item()
             
-            # Generate keypoints based on the predicted pose
-            keypoints = generate_keypoints(predicted_pose)
+            # Map numerical prediction to pose class name
+            predicted_pose = POSE_CLASSES[pose_idx]
             
-            return jsonify({
-                'human_present': human_present,
-                'pose_class': predicted_pose,
-                'keypoints': keypoints,
-                'confidence': confidence_dict
-            })
+            # Convert presence prediction to boolean
+            human_present = bool(presence_pred[0].item() > 0.5)
             
-        except Exception as e:
-            return jsonify({'error': str(e)}), 500
-        finally:
-            # Clean up uploaded file
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            # Calculate confidence scores for each pose
+            confidence_row = torch.nn.functional.softmax(pose_logits, dim=1)[0].numpy()
+            confidences = confidence_row.tolist()
+            confidence_dict = {POSE_CLASSES[i]: confidences[i] for i in range(len(POSE_CLASSES))}
+            
+            # Skeleton blended from the pose templates by class confidence
+            keypoints = keypoints_to_points(blend_keypoints(confidence_row)[0])
+        
+        result = {
+            'human_present': human_present,
+            'pose_class': predicted_pose,
+            'keypoints': keypoints,
+            'confidence': confidence_dict,
+            'rows_used': features.size(0),
+            'model_version': model_version
+        }
+        
+        with timer.stage('serialize'):
+            response = jsonify(result)
+        if result_cache is not None:
+            # Timed on its own: put() serializes the result again for its store
+            with timer.stage('cache_store'):
+                result_cache.put(cache_key, result)
+        return response
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/infer/batch', methods=['POST'])
+def infer_batch():
+    # Pose timeline over sliding windows of a long recording
+    timer = g.timer
+    try:
+        with timer.stage('parse'):
+            features = read_upload_features()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Window parameters can come from the form or the query string
+    try:
+        seq_len, stride = read_window_params()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    # keypoints=0 drops the skeleton timeline; smooth averages it over that
+    # many consecutive windows
+    with_keypoints = request.values.get('keypoints', '1') != '0'
+    smooth = request.values.get('smooth', 1, type=int)
+    if smooth is None or smooth <= 0:
+        return jsonify({'error': 'smooth must be a positive integer'}), 400
+    
+    model, model_version = model_slot.get()
+    if model is None:
+        return jsonify({'error': 'Model not loaded'}), 500
     
-    return jsonify({'error': 'Invalid file type'}), 400
+    try:
+        if features.size(0) < seq_len:
+            return jsonify({'error': f'Recording has fewer than seq_len={seq_len} rows'}), 400
+        
+        if result_cache is not None:
+            with timer.stage('cache'):
+                cache_key = ResultCache.key(f"{model.name}-{model_version}", 'infer_batch',
+                                            features, (seq_len, stride, with_keypoints, smooth))
+                cached = result_cache.get(cache_key)
+            if cached is not None:
+                return jsonify(cached)
+        
+        # The whole recording is filtered once, before it is cut into windows
+        with timer.stage('preprocess'):
+            features, _ = preprocess_features(model, features)
+        windows = make_windows(features, seq_len, stride)
+        
+        with timer.stage('forward'):
+            presence, confidences = predict_windows(model, windows)
+        
+        with timer.stage('postprocess'):
+            pose_idx = confidences.argmax(dim=1).tolist()
+            result = {
+                'num_windows': len(pose_idx),
+                'seq_len': seq_len,
+                'stride': stride,
+                'window_start': [i * stride for i in range(len(pose_idx))],
+                'human_present': (presence > 0.5).tolist(),
+                'presence_score': presence.tolist(),
+                'pose_class': [POSE_CLASSES[i] for i in pose_idx],
+                'confidence': confidences.tolist(),
+                'model_version': model_version
+            }
+            if with_keypoints:
+                # Flat [num_windows * NUM_KEYPOINTS * 2] x, y list, far smaller
+                # and faster to encode than per-joint objects
+                keypoints = smooth_keypoints(blend_keypoints(confidences.numpy()), smooth)
+                result['keypoints'] = flatten_keypoints(keypoints)
+                result['keypoints_shape'] = [len(pose_idx), NUM_KEYPOINTS, 2]
+        
+        with timer.stage('serialize'):
+            response = jsonify(result)
+        if result_cache is not None:
+            # Timed on its own: put() serializes the result again for its store
+            with timer.stage('cache_store'):
+                result_cache.put(cache_key, result)
+        return response
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    # Queue a sliding-window analysis of a long recording; returns 202 with
+    # the job id straight away
+    if job_queue.full():
+        # Push back before the (possibly large) body is read
+        response = jsonify({'error': 'Job queue is full, retry later'})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+    
+    # The job keeps the model it was submitted with across hot swaps
+    model, model_version = model_slot.get()
+    if model is None:
+        return jsonify({'error': 'Model not loaded'}), 500
+    
+    try:
+        with g.timer.stage('parse'):
+            seq_len, stride = read_window_params()
+            payload, kind = spool_job_upload()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        job = job_queue.submit(run_analysis_job, kind, seq_len, stride, model, model_version, payload=payload)
+    except QueueFull as e:
+        response = jsonify({'error': str(e)})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+    
+    response = jsonify({'job_id': job.id, 'status': job.status,
+                        'status_url': f'/jobs/{job.id}', 'results_url': f'/jobs/{job.id}/results'})
+    response.headers['Location'] = f'/jobs/{job.id}'
+    return response, 202
+
+@app.route('/jobs', methods=['GET'])
+def jobs_stats():
+    return jsonify(job_queue.stats())
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    # Progress and results so far; ?since=N returns only rows from index N
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    since = request.args.get('since', 0, type=int)
+    snapshot = job.snapshot(max(since or 0, 0))
+    if snapshot is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    return jsonify(snapshot)
+
+@app.route('/jobs/<job_id>/results', methods=['GET'])
+def job_results(job_id):
+    # NDJSON: one line per window as it is produced, then a final status line
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    
+    def generate():
+        for row in job.follow():
+            yield json.dumps(row) + '\n'
+        # Removed jobs have no status left to report
+        status = job.read_status() or {'status': 'removed', 'summary': None, 'error': None}
+        yield json.dumps({'status': status['status'], 'summary': status['summary'],
+                          'error': status['error']}) + '\n'
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def delete_job(job_id):
+    # Cancel a queued or running job and forget it
+    job = job_queue.remove(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    return jsonify({'job_id': job_id, 'status': job.status})
+
+@app.route('/scheduler/stats', methods=['GET'])
+def scheduler_stats():
+    # Queue depth and batch-size histograms for tuning the micro-batcher
+    if scheduler is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(enabled=True, **scheduler.stats()))
+
+@app.route('/stream', methods=['POST'])
+def open_stream():
+    # Open a streaming session that keeps LSTM state between pushes
+    model, model_version = model_slot.get()
+    if model is None:
+        return jsonify({'error': 'Model not loaded'}), 500
+    if not supports_streaming(model):
+        return jsonify({'error': f'Streaming is not supported by the {model.name} backend'}), 501
+    
+    session_id = create_stream_session(model, model_version)
+    if session_id is None:
+        return jsonify({'error': 'Too many open streaming sessions'}), 503
+    
+    return jsonify({'session_id': session_id}), 201
+
+@app.route('/stream/<session_id>', methods=['POST'])
+def push_stream(session_id):
+    # Push a chunk of CSI frames as JSON: {"frames": [[...30 values...], ...]}
+    session = get_stream_session(session_id)
+    if session is None:
+        return jsonify({'error': 'Unknown or expired session'}), 404
+    
+    payload = request.get_json(silent=True)
+    if not payload or 'frames' not in payload:
+        return jsonify({'error': 'No frames provided'}), 400
+    
+    try:
+        frames = parse_stream_frames(payload['frames'])
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        return jsonify(advance_stream(session, frames))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/stream/<session_id>', methods=['DELETE'])
+def close_stream(session_id):
+    session = get_stream_session(session_id, close=True)
+    if session is None:
+        return jsonify({'error': 'Unknown or expired session'}), 404
+    return jsonify({'session_id': session_id, 'frames_seen': session.frames_seen})
+
+@app.route('/sensors/frames', methods=['POST'])
+def push_sensor_frames():
+    # Frames tagged with a sensor id (and room) go into that sensor's ring;
+    # inference runs in the periodic batched step, not per request
+    model, model_version = model_slot.get()
+    if model is None:
+        return jsonify({'error': 'Model not loaded'}), 500
+    
+    try:
+        packets = parse_sensor_packets(request.get_json(silent=True))
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    sensor_hub.start(run_fanin_step, FANIN_INTERVAL_MS / 1000)
+    rows_seen = {}
+    try:
+        for sensor_id, room, frames in packets:
+            rows_seen[sensor_id] = sensor_hub.push(sensor_id, room, frames, model.preprocessor, model_version)
+    except HubFull as e:
+        return jsonify({'error': str(e), 'rows_seen': rows_seen}), 503
+    return jsonify({'accepted': len(packets), 'rows_seen': rows_seen})
+
+@app.route('/sensors', methods=['GET'])
+def sensors_stats():
+    return jsonify(sensor_hub.stats())
+
+@app.route('/sensors/<sensor_id>', methods=['GET'])
+def sensor_status(sensor_id):
+    # Latest prediction for one link; fields other than rows_seen appear once
+    # it has a full window and the batched step has run
+    result = sensor_hub.sensor_result(sensor_id, POSE_CLASSES)
+    if result is None:
+        return jsonify({'error': 'Unknown or expired sensor'}), 404
+    return jsonify(result)
+
+@app.route('/rooms', methods=['GET'])
+def rooms_status():
+    # Presence and pose fused across each room's sensors
+    return jsonify({'rooms': sensor_hub.rooms_result(POSE_CLASSES), 'model_version': model_slot.get()[1]})
+
+@app.route('/rooms/<room>', methods=['GET'])
+def room_status(room):
+    result = sensor_hub.rooms_result(POSE_CLASSES).get(room)
+    if result is None:
+        return jsonify({'error': 'No sensor results for this room'}), 404
+    return jsonify(dict(result, room=room, model_version=model_slot.get()[1]))
+
+if sock is not None:
+    @sock.route('/stream/ws')
+    def stream_ws(ws):
+        # One session per connection; each message is a JSON list of frames
+        model, model_version = model_slot.get()
+        if not supports_streaming(model):
+            ws.send(json.dumps({'error': 'Streaming is not available'}))
+            return
+        
+        session = StreamSession(model, model_version)
+        while True:
+            message = ws.receive()
+            if message is None:
+                break
+            try:
+                frames = parse_stream_frames(json.loads(message))
+                ws.send(json.dumps(advance_stream(session, frames)))
+            except (TypeError, ValueError) as e:
+                ws.send(json.dumps({'error': str(e)}))
 
 if __name__ == '__main__':
+    # Development server; use backend/serve.py for multi-process serving
+    warm_up()
+    start_model_watcher()
     app.run(debug=True, port=5000, host='0.0.0.0')
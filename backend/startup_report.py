@@ -0,0 +1,82 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter so nothing is already imported or cached
+CHILD_SCRIPT = """
+import json, time
+start = time.perf_counter()
+from backend import server
+server.warm_up()
+timings = dict(server.startup_timings, total_seconds=time.perf_counter() - start)
+print(json.dumps({'timings': timings, 'ready': server.ready.is_set(),
+                  'backend': server.INFERENCE_BACKEND}))
+"""
+
+
+def parse_importtime(stderr, top):
+    # Slowest modules by cumulative import time from python -X importtime
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        if not self_us.strip().isdigit():
+            continue  # Header line
+        entries.append((int(cumulative_us), int(self_us), name.strip()))
+    entries.sort(reverse=True)
+    return [{'module': name, 'cumulative_ms': cumulative / 1000, 'self_ms': self_time / 1000}
+            for cumulative, self_time, name in entries[:top]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report server cold-start time: imports, model load and warm-up")
+    parser.add_argument('--target', type=float, default=1.0, help="Readiness target in seconds")
+    parser.add_argument('--top', type=int, default=15, help="Slowest imports to list")
+    parser.add_argument('--output', default=None, help="Also write the report as JSON here")
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get('PYTHONPATH')])))
+    start = time.perf_counter()
+    child = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD_SCRIPT],
+                           capture_output=True, text=True, env=env)
+    process_seconds = time.perf_counter() - start
+    if child.returncode != 0:
+        sys.exit(f"Server failed to start:\n{child.stderr[-2000:]}")
+
+    result = json.loads(child.stdout.strip().splitlines()[-1])
+    timings = result['timings']
+    report = {
+        'backend': result['backend'],
+        'ready': result['ready'],
+        'timings': timings,
+        'process_seconds': process_seconds,
+        'target_seconds': args.target,
+        'meets_target': result['ready'] and timings['total_seconds'] <= args.target,
+        'slowest_imports': parse_importtime(child.stderr, args.top)
+    }
+
+    print(f"Backend: {report['backend']}")
+    for name in ('import_seconds', 'model_load_seconds', 'warm_up_seconds', 'total_seconds'):
+        if name in timings:
+            print(f"{name.replace('_seconds', '').replace('_', ' '):<12} {timings[name] * 1000:>9.1f} ms")
+    print(f"{'process':<12} {process_seconds * 1000:>9.1f} ms (including interpreter start-up)")
+    print(f"Ready: {report['ready']}, target {args.target:.2f}s: "
+          f"{'met' if report['meets_target'] else 'missed'}")
+    print("\nSlowest imports (cumulative):")
+    for entry in report['slowest_imports']:
+        print(f"  {entry['cumulative_ms']:>9.1f} ms  {entry['module']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved startup report to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
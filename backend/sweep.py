@@ -0,0 +1,187 @@
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import torch
+
+# Add the parent directory to the path so we can import the backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.benchmark import percentiles
+from backend.model import load_state_dict, model_from_state_dict
+from backend.train_lstm_pose import load_windowed_dataset, train_model
+
+# Search space: each key is a build_model argument or a
+# train_model setting. A list is a set of choices (the grid); a
+# {"low", "high", "log"} dict is a continuous range for random search
+DEFAULT_SPACE = {
+    'hidden_size': [16, 32, 64, 128],
+    'num_layers': [1, 2],
+    'learning_rate': [0.0003, 0.001, 0.003],
+    'batch_size': [64, 256]
+}
+
+
+def grid_configs(space):
+    for key, values in space.items():
+        if not isinstance(values, list):
+            raise ValueError(f"Grid search needs a list of values for {key}")
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*space.values())]
+
+
+def random_configs(space, num_trials, seed=0):
+    rng = np.random.default_rng(seed)
+    configs = []
+    for _ in range(num_trials):
+        config = {}
+        for key, values in space.items():
+            if isinstance(values, list):
+                config[key] = values[rng.integers(len(values))]
+            elif values.get('log'):
+                config[key] = float(np.exp(rng.uniform(np.log(values['low']), np.log(values['high']))))
+            else:
+                config[key] = float(rng.uniform(values['low'], values['high']))
+        configs.append(config)
+    return configs
+
+
+def init_trial_worker(threads):
+    # Bound intra-op threads so parallel trials don't oversubscribe the cores
+    torch.set_num_threads(threads)
+
+
+def run_trial(trial_id, config, num_epochs, trial_dir, dataset_path, seq_len):
+    # Train (or continue training) one trial up to num_epochs. The checkpoint
+    # lets a trial that survives a rung pick up where it stopped
+    os.makedirs(trial_dir, exist_ok=True)
+    settings = {'seq_len': seq_len, **config}
+    history = train_model(dataset_path, fast=True, num_epochs=num_epochs,
+                          checkpoint_path=os.path.join(trial_dir, 'checkpoint.pt'), resume=True,
+                          model_path=os.path.join(trial_dir, 'model.pth'), plot_path=None, **settings)
+    return trial_id, {
+        'epochs': len(history['val_losses']),
+        'val_loss': history['val_losses'][-1],
+        'best_val_loss': history['best_val_loss'],
+        'presence_accuracy': history['presence_accuracies'][-1],
+        'pose_accuracy': history['pose_accuracies'][-1],
+        'samples_per_sec': float(np.mean(history['throughput']))
+    }
+
+
+def measure_latency(model_path, config, seq_len, runs=200, warmup=20):
+    # Single-window forward latency of the trained trial model, rebuilt from
+    # its weights so every architecture in the space is timed as trained
+    model = model_from_state_dict(load_state_dict(model_path))
+    x = torch.randn(1, config.get('seq_len', seq_len) or 1, 30)
+    timings = []
+    with torch.no_grad():
+        for i in range(warmup + runs):
+            start = time.perf_counter()
+            model(x)
+            if i >= warmup:
+                timings.append((time.perf_counter() - start) * 1000)
+    num_params = sum(p.numel() for p in model.parameters())
+    return dict(percentiles(timings), num_params=num_params)
+
+
+def successive_halving(configs, dataset_path, out_dir, seq_len=50, min_epochs=2, max_epochs=16,
+                       eta=2, parallel=None, threads=None):
+    # Train every config for min_epochs, keep the best 1/eta by validation
+    # loss, train those eta times longer, and so on up to max_epochs
+    parallel = parallel or max(1, min(len(configs), os.cpu_count() or 1))
+    threads = threads or max(1, (os.cpu_count() or 1) // parallel)
+    # Convert the CSV to .npy once here rather than racing in every trial
+    for trial_seq_len in {config.get('seq_len', seq_len) for config in configs} - {None}:
+        load_windowed_dataset(dataset_path, trial_seq_len)
+
+    trials = [{'trial': i, 'config': config, 'status': 'running'} for i, config in enumerate(configs)]
+    alive = list(range(len(trials)))
+    budget = min_epochs
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=parallel, mp_context=context,
+                             initializer=init_trial_worker, initargs=(threads,)) as executor:
+        while alive:
+            print(f"Rung: {len(alive)} trials to {budget} epochs "
+                  f"({parallel} in parallel, {threads} threads each)")
+            futures = [executor.submit(run_trial, i, trials[i]['config'], budget,
+                                       os.path.join(out_dir, f'trial_{i:03d}'), dataset_path, seq_len)
+                       for i in alive]
+            for future in futures:
+                trial_id, result = future.result()
+                trials[trial_id].update(result)
+
+            if budget >= max_epochs or len(alive) == 1:
+                for i in alive:
+                    trials[i]['status'] = 'completed'
+                break
+            alive.sort(key=lambda i: trials[i]['val_loss'])
+            keep = max(1, math.ceil(len(alive) / eta))
+            for i in alive[keep:]:
+                trials[i]['status'] = f'stopped at {budget} epochs'
+            alive = alive[:keep]
+            budget = min(budget * eta, max_epochs)
+
+    for trial in trials:
+        model_path = os.path.join(out_dir, f"trial_{trial['trial']:03d}", 'model.pth')
+        trial.update(measure_latency(model_path, trial['config'], seq_len))
+    return trials
+
+
+def print_table(title, trials):
+    print(f"\n{title}")
+    print(f"{'Trial':>5} {'Config':<62} {'Epochs':>6} {'Val loss':>9} {'Presence %':>11} "
+          f"{'Pose %':>7} {'p50 ms':>7} {'Params':>8}  Status")
+    for t in trials:
+        config = ' '.join(f"{k}={v:.2g}" if isinstance(v, float) else f"{k}={v}" for k, v in t['config'].items())
+        print(f"{t['trial']:>5} {config:<62} {t['epochs']:>6} {t['val_loss']:>9.4f} "
+              f"{t['presence_accuracy']:>11.2f} {t['pose_accuracy']:>7.2f} {t['p50_ms']:>7.3f} "
+              f"{t['num_params']:>8}  {t['status']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel hyperparameter sweep with successive halving")
+    parser.add_argument('--data', default='dataset.csv')
+    parser.add_argument('--space', default=None, help="JSON search space (defaults to DEFAULT_SPACE)")
+    parser.add_argument('--mode', choices=['grid', 'random'], default='grid')
+    parser.add_argument('--trials', type=int, default=16, help="Number of random configs")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--seq-len', type=int, default=50)
+    parser.add_argument('--min-epochs', type=int, default=2)
+    parser.add_argument('--max-epochs', type=int, default=16)
+    parser.add_argument('--eta', type=int, default=2, help="Keep 1/eta of the trials at each rung")
+    parser.add_argument('--parallel', type=int, default=None, help="Trials trained at once")
+    parser.add_argument('--threads', type=int, default=None, help="Torch threads per trial")
+    parser.add_argument('--out-dir', default='sweep')
+    args = parser.parse_args()
+
+    space = DEFAULT_SPACE
+    if args.space:
+        with open(args.space) as f:
+            space = json.load(f)
+    configs = grid_configs(space) if args.mode == 'grid' else random_configs(space, args.trials, args.seed)
+
+    trials = successive_halving(configs, args.data, args.out_dir, args.seq_len, args.min_epochs,
+                                args.max_epochs, args.eta, args.parallel, args.threads)
+
+    by_accuracy = sorted(trials, key=lambda t: (-t['epochs'], -t['pose_accuracy'], -t['presence_accuracy']))
+    by_latency = sorted(trials, key=lambda t: (t['p50_ms'], -t['pose_accuracy']))
+    print_table("Ranked by accuracy (longest-trained first)", by_accuracy)
+    print_table("Ranked by inference latency", by_latency)
+
+    output = os.path.join(args.out_dir, 'sweep_results.json')
+    with open(output, 'w') as f:
+        json.dump({'space': space, 'mode': args.mode, 'seq_len': args.seq_len,
+                   'by_accuracy': by_accuracy, 'by_latency': by_latency}, f, indent=2)
+    print(f"\nSaved sweep results to {output}; trial checkpoints are in {args.out_dir}/trial_*/")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,55 +1,63 @@
+import argparse
+import os
+import socket
+import sys
+import time
 import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
 import torch.nn as nn
-from torch.utils.data import Dataset, DataLoader
+import torch.nn.functional as F
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data import Dataset, DataLoader, Subset, DistributedSampler
 import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
-import matplotlib.pyplot as plt
-
-# Define the LSTM Model
-class LSTM_Model(nn.Module):
-    def __init__(self, input_size=30, hidden_size=64, num_layers=2, num_classes=4):
-        super(LSTM_Model, self).__init__()
-        self.hidden_size = hidden_size
-        self.num_layers = num_layers
-        self.lstm = nn.LSTM(input_size, hidden_size, num_layers, batch_first=True)
-        self.fc1 = nn.Linear(hidden_size, 32)
-        self.fc2 = nn.Linear(32, num_classes + 1)  # +1 for presence detection
-        self.relu = nn.ReLU()
-        self.sigmoid = nn.Sigmoid()
-
-    def forward(self, x):
-        # Check if input is unbatched (2D) and add batch dimension if needed
-        if x.dim() == 2:
-            x = x.unsqueeze(0)  # Add batch dimension [1, seq_len, features]
-            
-        # Initialize hidden state with zeros
-        batch_size = x.size(0)
-        h0 = torch.zeros(self.num_layers, batch_size, self.hidden_size).to(x.device)
-        c0 = torch.zeros(self.num_layers, batch_size, self.hidden_size).to(x.device)
-        
-        # Forward propagate LSTM
-        out, _ = self.lstm(x, (h0, c0))
-        
-        # Decode the hidden state of the last time step
-        out = out[:, -1, :]
-        out = self.relu(self.fc1(out))
-        out = self.fc2(out)
-        
-        # Split output into presence and pose
-        presence = self.sigmoid(out[:, 0])
-        pose = out[:, 1:]
-        
-        return presence, pose
+
+# Add the parent directory to the path so we can import the model definition
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.model import ARCHITECTURES, LSTM_Model, build_model, load_state_dict, model_from_state_dict
+from backend.convert_dataset import convert_csv_parallel, is_converted
+from backend.preprocessing import Preprocessor, load_preprocessor, preprocess_npy, preprocessor_path
+
+def npy_prefix(path):
+    # The .npy dataset prefix a path refers to, or None for a CSV file. Accepts
+    # the prefix itself or its <prefix>_csi.npy file
+    if path.endswith('_csi.npy'):
+        return path[:-len('_csi.npy')]
+    if not path.endswith('.csv') and os.path.exists(f"{path}_csi.npy"):
+        return path
+    return None
 
 # Custom Dataset class
 class CSIDataset(Dataset):
-    def __init__(self, csv_file):
-        data = pd.read_csv(csv_file)
-        # Updated to use 'subcarrier_X' columns instead of 'csi_X'
-        self.csi_data = torch.FloatTensor(data.iloc[:, :-2].values)  # All columns except last two
-        self.presence = torch.FloatTensor(data.iloc[:, -2].values)   # Second-to-last column
-        self.pose = torch.LongTensor(data.iloc[:, -1].values)       # Last column
+    def __init__(self, csv_file, preprocessor=None):
+        prefix = npy_prefix(csv_file)
+        if prefix is not None:
+            # Binary dataset (see backend/convert_dataset.py): each column group
+            # is one contiguous array read straight into a tensor
+            self.csi_data = torch.from_numpy(np.load(f"{prefix}_csi.npy"))
+            self.presence = torch.from_numpy(np.load(f"{prefix}_presence.npy"))
+            self.pose = torch.from_numpy(np.load(f"{prefix}_pose.npy"))
+        else:
+            data = pd.read_csv(csv_file)
+            # Updated to use 'subcarrier_X' columns instead of 'csi_X'
+            self.csi_data = torch.FloatTensor(data.iloc[:, :-2].values)  # All columns except last two
+            self.presence = torch.FloatTensor(data.iloc[:, -2].values)   # Second-to-last column
+            self.pose = torch.LongTensor(data.iloc[:, -1].values)       # Last column
+        if preprocessor is not None:
+            self.preprocess(preprocessor)
+    
+    def raw_csi(self):
+        return self.csi_data.numpy()
+    
+    def preprocess(self, preprocessor):
+        # Rows of the per-row dataset are not time-ordered, so only the
+        # per-subcarrier normalisation applies; the causal filters would mix
+        # unrelated samples
+        if preprocessor.temporal:
+            raise ValueError("The per-row dataset is not time-ordered; use seq_len for the "
+                             "Hampel and low-pass stages, or disable them")
+        self.csi_data = torch.from_numpy(preprocessor(self.csi_data.numpy()))
 
     def __len__(self):
         return len(self.csi_data)
@@ -57,124 +65,556 @@ class CSIDataset(Dataset):
     def __getitem__(self, idx):
         return self.csi_data[idx], self.presence[idx], self.pose[idx]
 
-def train_model():
+# Sequence dataset over memory-mapped .npy files
+class WindowedCSIDataset(Dataset):
+    def __init__(self, prefix, seq_len=50, stride=1, preprocessor=None):
+        self.prefix = prefix
+        self.seq_len = seq_len
+        self.stride = stride
+        self.csi_file = f"{prefix}_csi.npy"
+        # Only the header is read here; the arrays are opened per process in
+        # _open() so DataLoader workers each get their own memory map
+        num_rows = np.load(f"{prefix}_presence.npy", mmap_mode='r').shape[0]
+        self.num_windows = max(0, (num_rows - seq_len) // stride + 1)
+        self.csi_data = None
+        if preprocessor is not None:
+            self.preprocess(preprocessor)
+
+    def _open(self):
+        self.csi_data = np.load(self.csi_file, mmap_mode='r')
+        self.presence = np.load(f"{self.prefix}_presence.npy", mmap_mode='r')
+        self.pose = np.load(f"{self.prefix}_pose.npy", mmap_mode='r')
+
+    def __len__(self):
+        return self.num_windows
+    
+    def raw_csi(self):
+        return np.load(f"{self.prefix}_csi.npy", mmap_mode='r')
+    
+    def preprocess(self, preprocessor):
+        # The filters need every earlier row, so the CSI is preprocessed once
+        # into <prefix>_csi.<tag>.npy, named after the stats, and workers
+        # memory-map that file like the raw one
+        self.csi_file = preprocess_npy(preprocessor, f"{self.prefix}_csi.npy",
+                                       f"{self.prefix}_csi.{preprocessor.tag()}.npy")
+        self.csi_data = None
+
+    def __getitem__(self, idx):
+        if self.csi_data is None:
+            self._open()
+        start = idx * self.stride
+        end = start + self.seq_len
+        # The window is labelled by its last row, which is what the model decodes
+        window = torch.from_numpy(np.array(self.csi_data[start:end]))
+        return window, torch.tensor(self.presence[end - 1]), torch.tensor(self.pose[end - 1])
+
+    def __getstate__(self):
+        # Memory maps are reopened in each worker rather than pickled
+        state = self.__dict__.copy()
+        state['csi_data'] = None
+        state.pop('presence', None)
+        state.pop('pose', None)
+        return state
+
+def load_windowed_dataset(csv_file, seq_len, stride=1, preprocessor=None):
+    # Convert the CSV once and reuse the .npy files on later runs until the
+    # CSV changes; a .npy dataset prefix is used as is
+    prefix = npy_prefix(csv_file)
+    if prefix is None:
+        prefix = os.path.splitext(csv_file)[0]
+        if not is_converted(csv_file, prefix):
+            convert_csv_parallel(csv_file, prefix)
+    return WindowedCSIDataset(prefix, seq_len, stride, preprocessor)
+
+class TensorBatches:
+    # A split held as contiguous in-memory tensors on the training device.
+    # Batches are sliced out by index in one gather instead of collating
+    # samples one __getitem__ at a time. With seq_len, indices are window
+    # starts and each window is labelled by its last row. A sampler (e.g. a
+    # DistributedSampler over positions) replaces the batch order
+    def __init__(self, tensors, indices, device, seq_len=None, sampler=None):
+        self.csi, self.presence, self.pose = (t.to(device) for t in tensors)
+        self.indices = torch.as_tensor(np.asarray(indices), dtype=torch.long, device=device)
+        self.offsets = torch.arange(seq_len, device=device) if seq_len else None
+        self.sampler = sampler
+
+    def __len__(self):
+        return len(self.sampler) if self.sampler is not None else len(self.indices)
+
+    def num_batches(self, batch_size):
+        return (len(self) + batch_size - 1) // batch_size
+
+    def batches(self, batch_size, shuffle=False):
+        indices = self.indices
+        if self.sampler is not None:
+            indices = indices[torch.as_tensor(list(self.sampler), device=indices.device)]
+        elif shuffle:
+            indices = indices[torch.randperm(len(indices), device=indices.device)]
+        for idx in indices.split(batch_size):
+            if self.offsets is None:
+                yield self.csi[idx], self.presence[idx], self.pose[idx]
+            else:
+                last = idx + self.offsets[-1]
+                yield self.csi[idx[:, None] + self.offsets], self.presence[last], self.pose[last]
+
+def dataset_tensors(dataset):
+    # (csi, presence, pose) of a whole dataset as in-memory tensors
+    if isinstance(dataset, WindowedCSIDataset):
+        dataset._open()
+        return tuple(torch.from_numpy(np.array(a)) for a in (dataset.csi_data, dataset.presence, dataset.pose))
+    return dataset.csi_data, dataset.presence, dataset.pose
+
+def as_sequences(csi):
+    # Per-row [batch, 30] samples become length-1 sequences; a bare 2D batch
+    # would otherwise be read by the model as one sequence of batch rows
+    return csi.unsqueeze(1) if csi.dim() == 2 else csi
+
+def numpy_rng_state():
+    # np.random state with the key array as a list, so the checkpoint holds
+    # only plain types and tensors
+    name, keys, pos, has_gauss, cached_gaussian = np.random.get_state()
+    return [name, keys.tolist(), pos, has_gauss, cached_gaussian]
+
+def save_checkpoint(path, state):
+    # Written to a temporary file and renamed so an interrupted save never
+    # leaves a truncated checkpoint behind
+    tmp_path = f"{path}.tmp"
+    torch.save(state, tmp_path)
+    os.replace(tmp_path, path)
+
+def distillation_loss(presence_pred, pose_pred, teacher_presence, teacher_pose, temperature):
+    # Soft targets from the teacher: its presence probability, and its pose
+    # distribution softened by temperature. The KL term is scaled by T^2 so
+    # its gradients keep their size as the temperature changes
+    presence_loss = F.binary_cross_entropy(presence_pred, teacher_presence)
+    pose_loss = F.kl_div(F.log_softmax(pose_pred / temperature, dim=1),
+                         F.softmax(teacher_pose / temperature, dim=1), reduction='batchmean')
+    return presence_loss + pose_loss * temperature ** 2
+
+def distributed_worker(rank, world_size, port, results, kwargs):
+    # Entry point of each data-parallel process started by train_model. The
+    # machine's cores are split evenly between the processes
+    os.environ.setdefault('MASTER_ADDR', '127.0.0.1')
+    os.environ['MASTER_PORT'] = str(port)
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) // world_size))
+    dist.init_process_group('gloo', rank=rank, world_size=world_size)
+    try:
+        history = train_model(**kwargs)
+        if rank == 0:
+            results.put(history)
+    finally:
+        dist.destroy_process_group()
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def train_model(dataset_path="dataset.csv", seq_len=None, num_workers=0, fast=False,
+                batch_size=None, num_epochs=50, compile_model=False,
+                checkpoint_path=None, checkpoint_every=1, resume=False, patience=None,
+                num_processes=1, model_path='pose_detection_model.pth', plot_path='training_loss.png',
+                hidden_size=64, num_layers=2, learning_rate=0.001, preprocess=None,
+                architecture='lstm', channels=32, kernel_size=3,
+                teacher_path=None, temperature=4.0, distill_alpha=0.5):
+    # seq_len=None keeps the original per-row CSIDataset; otherwise the model
+    # is trained on [seq_len, 30] windows from a memory-mapped copy of the data.
+    # fast=True loads the whole dataset into tensors and slices batches by
+    # index instead of going through a DataLoader. With checkpoint_path, the
+    # model, optimizer and history are saved every checkpoint_every epochs and
+    # resume=True continues from there. patience stops training after that
+    # many epochs without a lower validation loss and keeps the best weights.
+    # num_processes > 1 trains with DistributedDataParallel over gloo on the
+    # CPU, one process per core group, each on a DistributedSampler shard;
+    # batch_size is then per process. Only rank 0 writes the checkpoint, the
+    # model (model_path) and the loss curve (plot_path); None skips either.
+    # preprocess is a dict of backend.preprocessing.Preprocessor settings ({}
+    # for the defaults): its stats are fitted on the training rows, applied to
+    # the whole dataset and saved next to model_path for the server.
+    # architecture picks the model: 'lstm' (hidden_size, num_layers) or the
+    # temporal 'cnn' (channels, num_layers, kernel_size). With teacher_path
+    # the model is distilled from that checkpoint: the loss is distill_alpha
+    # times the label loss plus the rest times the loss against the teacher's
+    # temperature-softened outputs, and the teacher's preprocessing is reused.
+    # Returns the per-epoch history
+    if num_processes > 1 and not dist.is_initialized():
+        kwargs = dict(locals())
+        results = mp.get_context('spawn').SimpleQueue()
+        mp.spawn(distributed_worker, args=(num_processes, free_port(), results, kwargs),
+                 nprocs=num_processes, join=True)
+        return results.get()
+    
+    distributed = dist.is_initialized()
+    rank = dist.get_rank() if distributed else 0
+    world_size = dist.get_world_size() if distributed else 1
+    is_main = rank == 0
+    
     # Set random seed for reproducibility
     torch.manual_seed(42)
     
     # Hyperparameters
     input_size = 30  # CSI data dimensions (number of subcarriers)
-    hidden_size = 64
-    num_layers = 2
     num_classes = 4  # Number of pose classes
-    num_epochs = 50
-    batch_size = 32
-    learning_rate = 0.001
+    if batch_size is None:
+        # Index-sliced batches are cheap, so the fast mode uses larger ones
+        batch_size = 256 if fast else 32
     
     # Load the dataset
-    print("Loading dataset...")
-    dataset = CSIDataset("dataset.csv")
+    if is_main:
+        print("Loading dataset...")
+    if seq_len is None:
+        dataset = CSIDataset(dataset_path)
+        
+        # Split into train and validation sets
+        train_size = int(0.8 * len(dataset))
+        val_size = len(dataset) - train_size
+        train_dataset, val_dataset = torch.utils.data.random_split(dataset, [train_size, val_size])
+    else:
+        # Rank 0 converts a new CSV; the others open its .npy files after it
+        if is_main:
+            dataset = load_windowed_dataset(dataset_path, seq_len)
+        if distributed:
+            dist.barrier()
+        if not is_main:
+            dataset = load_windowed_dataset(dataset_path, seq_len)
+        
+        # Split by time so overlapping windows don't leak into validation
+        train_size = int(0.8 * len(dataset))
+        train_dataset = Subset(dataset, range(train_size))
+        val_dataset = Subset(dataset, range(train_size + seq_len, len(dataset)))
     
-    # Split into train and validation sets
-    train_size = int(0.8 * len(dataset))
-    val_size = len(dataset) - train_size
-    train_dataset, val_dataset = torch.utils.data.random_split(dataset, [train_size, val_size])
+    preprocessor = None
+    teacher = None
+    if teacher_path is not None:
+        if model_path and os.path.abspath(model_path) == os.path.abspath(teacher_path):
+            raise ValueError("The distilled model would overwrite its teacher; pass another model_path")
+        teacher = model_from_state_dict(load_state_dict(teacher_path))
+        # The student sees the same inputs the teacher was trained on
+        preprocessor = load_preprocessor(teacher_path)
+    elif preprocess is not None:
+        settings = dict(preprocess)
+        if seq_len is None:
+            # Per-row samples are not time-ordered: normalisation only
+            settings.update(hampel_window=0, filter_cutoff=None)
+            if is_main:
+                print("Per-row training: skipping the Hampel and low-pass stages")
+            fit_csi = dataset.raw_csi()[np.asarray(train_dataset.indices)]
+        else:
+            # The rows covered by the training windows, in time order
+            fit_csi = dataset.raw_csi()[:train_size + seq_len - 1]
+        # Every rank fits the same stats
+        preprocessor = Preprocessor(**settings).fit(fit_csi)
+        del fit_csi
+    if preprocessor is not None:
+        # Rank 0 writes any preprocessed copy of the data; the others reuse it
+        if is_main:
+            dataset.preprocess(preprocessor)
+        if distributed:
+            dist.barrier()
+        if not is_main:
+            dataset.preprocess(preprocessor)
     
-    train_loader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True)
-    val_loader = DataLoader(val_dataset, batch_size=batch_size, shuffle=False)
+    # Distributed training runs on CPU cores over gloo
+    device = torch.device("cuda" if torch.cuda.is_available() and not distributed else "cpu")
+    # Every rank sees the same split (same seed) and trains on its own shard
+    train_sampler = val_sampler = None
+    if distributed:
+        train_sampler = DistributedSampler(train_dataset, world_size, rank, shuffle=True, seed=42)
+        val_sampler = DistributedSampler(val_dataset, world_size, rank, shuffle=False)
+    if fast:
+        tensors = dataset_tensors(dataset)
+        train_data = TensorBatches(tensors, train_dataset.indices, device, seq_len, train_sampler)
+        val_data = TensorBatches(tensors, val_dataset.indices, device, seq_len, val_sampler)
+        train_batches = lambda: train_data.batches(batch_size, shuffle=True)
+        val_batches = lambda: val_data.batches(batch_size)
+        num_train_batches = train_data.num_batches(batch_size)
+        num_val_batches = val_data.num_batches(batch_size)
+    else:
+        loader_kwargs = {'num_workers': num_workers, 'persistent_workers': num_workers > 0}
+        train_loader = DataLoader(train_dataset, batch_size=batch_size, shuffle=train_sampler is None,
+                                  sampler=train_sampler, **loader_kwargs)
+        val_loader = DataLoader(val_dataset, batch_size=batch_size, shuffle=False,
+                                sampler=val_sampler, **loader_kwargs)
+        train_batches = lambda: train_loader
+        val_batches = lambda: val_loader
+        num_train_batches = len(train_loader)
+        num_val_batches = len(val_loader)
     
     # Initialize the model
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    model = LSTM_Model(input_size, hidden_size, num_layers, num_classes).to(device)
+    model = build_model(architecture, input_size, hidden_size, num_layers, num_classes,
+                        channels, kernel_size).to(device)
+    if teacher is not None:
+        teacher = teacher.to(device)
+        for p in teacher.parameters():
+            p.requires_grad_(False)
+    # The DDP and compiled wrappers share their parameters with model, which
+    # is what gets saved
+    forward = DistributedDataParallel(model) if distributed else model
+    if compile_model and hasattr(torch, 'compile'):
+        forward = torch.compile(forward)
     
     # Loss and optimizer
     presence_criterion = nn.BCELoss()
     pose_criterion = nn.CrossEntropyLoss()
     optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate)
     
-    # Training loop
-    print("Starting training...")
     train_losses = []
     val_losses = []
+    presence_accuracies = []
+    pose_accuracies = []
+    throughput = []
+    epoch_seconds = []
+    start_epoch = 0
+    best_val_loss = float('inf')
+    best_state = None
+    epochs_without_improvement = 0
+    
+    if resume and checkpoint_path and os.path.exists(checkpoint_path):
+        checkpoint = torch.load(checkpoint_path, map_location='cpu')
+        model.load_state_dict(checkpoint['model'])
+        optimizer.load_state_dict(checkpoint['optimizer'])
+        torch.set_rng_state(checkpoint['rng_state'])
+        # Checkpoints from before these were saved only have the torch CPU state
+        if checkpoint.get('cuda_rng_state') and torch.cuda.is_available():
+            torch.cuda.set_rng_state_all(checkpoint['cuda_rng_state'])
+        if checkpoint.get('numpy_rng_state') is not None:
+            name, keys, pos, has_gauss, cached_gaussian = checkpoint['numpy_rng_state']
+            np.random.set_state((name, np.array(keys, dtype=np.uint32), pos, has_gauss, cached_gaussian))
+        start_epoch = checkpoint['epoch']
+        train_losses = checkpoint['train_losses']
+        val_losses = checkpoint['val_losses']
+        presence_accuracies = checkpoint.get('presence_accuracies', [])
+        pose_accuracies = checkpoint.get('pose_accuracies', [])
+        throughput = checkpoint['throughput']
+        epoch_seconds = checkpoint.get('epoch_seconds', [])
+        best_val_loss = checkpoint['best_val_loss']
+        best_state = checkpoint['best_state']
+        epochs_without_improvement = checkpoint['epochs_without_improvement']
+        if is_main:
+            print(f"Resuming from {checkpoint_path} after epoch {start_epoch}")
     
-    for epoch in range(num_epochs):
+    # Training loop
+    if is_main:
+        print("Starting training...")
+    for epoch in range(start_epoch, num_epochs):
+        if train_sampler is not None:
+            train_sampler.set_epoch(epoch)
         model.train()
-        total_train_loss = 0
+        # Metrics stay on the device and are read once per epoch, so batches
+        # don't wait on a host sync
+        total_train_loss = torch.zeros((), device=device)
+        train_samples = 0
+        epoch_start = time.perf_counter()
         
-        for batch_idx, (csi, presence, pose) in enumerate(train_loader):
-            csi, presence, pose = csi.to(device), presence.to(device), pose.to(device)
+        for csi, presence, pose in train_batches():
+            csi, presence, pose = as_sequences(csi).to(device), presence.to(device), pose.to(device)
             
             # Forward pass
-            presence_pred, pose_pred = model(csi)
+            presence_pred, pose_pred = forward(csi)
             
             # Calculate loss
             presence_loss = presence_criterion(presence_pred, presence)
             pose_loss = pose_criterion(pose_pred, pose)
             loss = presence_loss + pose_loss
+            if teacher is not None:
+                with torch.no_grad():
+                    teacher_presence, teacher_pose = teacher(csi)
+                loss = distill_alpha * loss + (1 - distill_alpha) * distillation_loss(
+                    presence_pred, pose_pred, teacher_presence, teacher_pose, temperature)
             
             # Backward and optimize
-            optimizer.zero_grad()
+            optimizer.zero_grad(set_to_none=True)
             loss.backward()
             optimizer.step()
             
-            total_train_loss += loss.item()
-            
-        avg_train_loss = total_train_loss / len(train_loader)
+            total_train_loss += loss.detach()
+            train_samples += presence.size(0)
+        
+        train_stats = torch.stack([total_train_loss, torch.tensor(float(train_samples), device=device)])
+        if distributed:
+            dist.all_reduce(train_stats)
+        elapsed = time.perf_counter() - epoch_start
+        avg_train_loss = train_stats[0].item() / (num_train_batches * world_size)
         train_losses.append(avg_train_loss)
+        samples_per_sec = train_stats[1].item() / elapsed
+        throughput.append(samples_per_sec)
+        epoch_seconds.append(elapsed)
         
         # Validation
         model.eval()
-        total_val_loss = 0
-        correct_presence = 0
-        correct_pose = 0
+        total_val_loss = torch.zeros((), device=device)
+        correct_presence = torch.zeros((), dtype=torch.long, device=device)
+        correct_pose = torch.zeros((), dtype=torch.long, device=device)
         total_samples = 0
         
         with torch.no_grad():
-            for csi, presence, pose in val_loader:
-                csi, presence, pose = csi.to(device), presence.to(device), pose.to(device)
+            for csi, presence, pose in val_batches():
+                csi, presence, pose = as_sequences(csi).to(device), presence.to(device), pose.to(device)
                 
                 # Forward pass
-                presence_pred, pose_pred = model(csi)
+                presence_pred, pose_pred = forward(csi)
                 
                 # Calculate loss
                 presence_loss = presence_criterion(presence_pred, presence)
                 pose_loss = pose_criterion(pose_pred, pose)
                 loss = presence_loss + pose_loss
                 
-                total_val_loss += loss.item()
+                total_val_loss += loss
                 
                 # Calculate accuracy
                 predicted_presence = (presence_pred > 0.5).float()
                 _, predicted_pose = torch.max(pose_pred, 1)
                 
-                correct_presence += (predicted_presence == presence).sum().item()
-                correct_pose += (predicted_pose == pose).sum().item()
+                correct_presence += (predicted_presence == presence).sum()
+                correct_pose += (predicted_pose == pose).sum()
                 total_samples += presence.size(0)
         
-        avg_val_loss = total_val_loss / len(val_loader)
+        # Every rank reduces the same totals, so they agree on early stopping
+        val_stats = torch.stack([total_val_loss.double(), correct_presence.double(), correct_pose.double(),
+                                 torch.tensor(float(total_samples), dtype=torch.float64, device=device)])
+        if distributed:
+            dist.all_reduce(val_stats)
+        avg_val_loss = val_stats[0].item() / (num_val_batches * world_size)
         val_losses.append(avg_val_loss)
         
-        presence_accuracy = 100 * correct_presence / total_samples
-        pose_accuracy = 100 * correct_pose / total_samples
+        presence_accuracy = 100 * val_stats[1].item() / val_stats[3].item()
+        pose_accuracy = 100 * val_stats[2].item() / val_stats[3].item()
+        presence_accuracies.append(presence_accuracy)
+        pose_accuracies.append(pose_accuracy)
+        
+        if is_main:
+            print(f'Epoch [{epoch+1}/{num_epochs}], '
+                  f'Train Loss: {avg_train_loss:.4f}, '
+                  f'Val Loss: {avg_val_loss:.4f}, '
+                  f'Presence Acc: {presence_accuracy:.2f}%, '
+                  f'Pose Acc: {pose_accuracy:.2f}%, '
+                  f'{samples_per_sec:.0f} samples/sec')
         
-        print(f'Epoch [{epoch+1}/{num_epochs}], '
-              f'Train Loss: {avg_train_loss:.4f}, '
-              f'Val Loss: {avg_val_loss:.4f}, '
-              f'Presence Acc: {presence_accuracy:.2f}%, '
-              f'Pose Acc: {pose_accuracy:.2f}%')
+        if avg_val_loss < best_val_loss:
+            best_val_loss = avg_val_loss
+            epochs_without_improvement = 0
+            if patience is not None:
+                best_state = {k: v.detach().clone() for k, v in model.state_dict().items()}
+        else:
+            epochs_without_improvement += 1
+        stop = patience is not None and epochs_without_improvement >= patience
+        
+        if is_main and checkpoint_path and ((epoch + 1) % checkpoint_every == 0 or stop or epoch + 1 == num_epochs):
+            save_checkpoint(checkpoint_path, {
+                'epoch': epoch + 1,
+                'model': model.state_dict(),
+                'optimizer': optimizer.state_dict(),
+                'rng_state': torch.get_rng_state(),
+                'cuda_rng_state': torch.cuda.get_rng_state_all() if torch.cuda.is_available() else None,
+                'numpy_rng_state': numpy_rng_state(),
+                'train_losses': train_losses,
+                'val_losses': val_losses,
+                'presence_accuracies': presence_accuracies,
+                'pose_accuracies': pose_accuracies,
+                'throughput': throughput,
+                'epoch_seconds': epoch_seconds,
+                'best_val_loss': best_val_loss,
+                'best_state': best_state,
+                'epochs_without_improvement': epochs_without_improvement,
+                'preprocess': preprocessor.to_dict() if preprocessor is not None else None
+            })
+        
+        if stop:
+            if is_main:
+                print(f"Early stopping: no validation improvement for {patience} epochs")
+            break
     
-    # Save the model
-    torch.save(model.state_dict(), 'pose_detection_model.pth')
+    # Save the model (the best epoch's weights when early stopping is on)
+    if best_state is not None:
+        model.load_state_dict(best_state)
+    if is_main and model_path:
+        torch.save(model.state_dict(), model_path)
+        # The server applies the stats saved next to the model; a model
+        # trained on raw CSI must not pick up stale ones
+        if preprocessor is not None:
+            preprocessor.save(preprocessor_path(model_path))
+        elif os.path.exists(preprocessor_path(model_path)):
+            os.remove(preprocessor_path(model_path))
     
     # Plot training and validation loss
-    plt.figure(figsize=(10, 6))
-    plt.plot(train_losses, label='Training Loss')
-    plt.plot(val_losses, label='Validation Loss')
-    plt.xlabel('Epoch')
-    plt.ylabel('Loss')
-    plt.title('Training and Validation Loss')
-    plt.legend()
-    plt.savefig('training_loss.png')
-    plt.close()
+    if is_main and plot_path:
+        # Imported here so loading this module (e.g. for validation) stays fast
+        import matplotlib.pyplot as plt
+        plt.figure(figsize=(10, 6))
+        plt.plot(train_losses, label='Training Loss')
+        plt.plot(val_losses, label='Validation Loss')
+        plt.xlabel('Epoch')
+        plt.ylabel('Loss')
+        plt.title('Training and Validation Loss')
+        plt.legend()
+        plt.savefig(plot_path)
+        plt.close()
+    
+    return {
+        'train_losses': train_losses,
+        'val_losses': val_losses,
+        'presence_accuracies': presence_accuracies,
+        'pose_accuracies': pose_accuracies,
+        'throughput': throughput,
+        'epoch_seconds': epoch_seconds,
+        'best_val_loss': best_val_loss
+    }
 
 if __name__ == "__main__":
-    train_model()
+    parser = argparse.ArgumentParser(description="Train the CSI pose detection model")
+    parser.add_argument('--data', default='dataset.csv',
+                        help="CSV file or .npy dataset prefix (see backend/convert_dataset.py)")
+    parser.add_argument('--seq-len', type=int, default=None,
+                        help="Train on windows of this many rows from a memory-mapped dataset")
+    parser.add_argument('--num-workers', type=int, default=0)
+    parser.add_argument('--fast', action='store_true',
+                        help="Keep the dataset in memory as tensors and slice batches by index")
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help="Defaults to 32, or 256 with --fast")
+    parser.add_argument('--epochs', type=int, default=50)
+    parser.add_argument('--model-path', default=None,
+                        help="Where to save the model (default pose_detection_model.pth, "
+                             "or pose_detection_student.pth with --teacher)")
+    parser.add_argument('--architecture', choices=ARCHITECTURES, default='lstm')
+    parser.add_argument('--hidden-size', type=int, default=64)
+    parser.add_argument('--num-layers', type=int, default=2,
+                        help="LSTM layers, or convolution layers with --architecture cnn")
+    parser.add_argument('--channels', type=int, default=32, help="CNN channels")
+    parser.add_argument('--kernel-size', type=int, default=3, help="CNN kernel size")
+    parser.add_argument('--lr', type=float, default=0.001)
+    parser.add_argument('--compile', action='store_true', help="Train through torch.compile")
+    parser.add_argument('--checkpoint', default=None,
+                        help="Save model and optimizer state here during training")
+    parser.add_argument('--checkpoint-every', type=int, default=1)
+    parser.add_argument('--resume', action='store_true', help="Continue from --checkpoint if it exists")
+    parser.add_argument('--patience', type=int, default=None,
+                        help="Stop after this many epochs without a lower validation loss")
+    parser.add_argument('--processes', type=int, default=1,
+                        help="Data-parallel CPU processes (DistributedDataParallel over gloo)")
+    parser.add_argument('--teacher', default=None,
+                        help="Distil from this checkpoint, e.g. --teacher pose_detection_model.pth "
+                             "--architecture cnn or --hidden-size 24 --num-layers 1")
+    parser.add_argument('--temperature', type=float, default=4.0, help="Distillation softmax temperature")
+    parser.add_argument('--alpha', type=float, default=0.5,
+                        help="Weight of the label loss against the teacher loss when distilling")
+    parser.add_argument('--preprocess', action='store_true',
+                        help="Hampel filter, low-pass filter and normalise the CSI (stats saved with the model)")
+    parser.add_argument('--hampel-window', type=int, default=5, help="Rows per Hampel window, 0 disables it")
+    parser.add_argument('--filter-cutoff', type=float, default=0.25,
+                        help="Low-pass cutoff as a fraction of Nyquist, 0 disables the filter")
+    args = parser.parse_args()
+    
+    preprocess = None
+    if args.preprocess:
+        preprocess = {'hampel_window': args.hampel_window, 'filter_cutoff': args.filter_cutoff or None}
+    
+    train_model(args.data, seq_len=args.seq_len, num_workers=args.num_workers, fast=args.fast,
+                batch_size=args.batch_size, num_epochs=args.epochs, compile_model=args.compile,
+                checkpoint_path=args.checkpoint, checkpoint_every=args.checkpoint_every,
+                resume=args.resume, patience=args.patience, num_processes=args.processes,
+                hidden_size=args.hidden_size, num_layers=args.num_layers, learning_rate=args.lr,
+                preprocess=preprocess, architecture=args.architecture, channels=args.channels,
+                kernel_size=args.kernel_size, teacher_path=args.teacher, temperature=args.temperature,
+                distill_alpha=args.alpha,
+                model_path=args.model_path or ('pose_detection_student.pth' if args.teacher
+                                               else 'pose_detection_model.pth'))
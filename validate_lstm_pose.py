@@ -1,18 +1,30 @@
 
 # validate_lstm_pose.py
 
+import argparse
+import json
+import time
 import torch
 import numpy as np
-from train_lstm_pose import LSTM_Model, CSIDataset
+from train_lstm_pose import (LSTM_Model, CSIDataset, TensorBatches, as_sequences, dataset_tensors,
+                             load_windowed_dataset)
+from quantize_model import quantize_model, model_size_mb
+from preprocessing import load_preprocessor
+from model import load_state_dict, model_from_state_dict
 from torch.utils.data import DataLoader
-from sklearn.metrics import confusion_matrix, classification_report
-import seaborn as sns
-import matplotlib.pyplot as plt
+
+POSE_NAMES = ['Stand', 'Sit', 'Kneel', 'Sleep']
 
 def validate_model():
+    # Plotting and report libraries take seconds to import, so only this
+    # full report pays for them
+    from sklearn.metrics import confusion_matrix, classification_report
+    import seaborn as sns
+    import matplotlib.pyplot as plt
+    
     print("Loading test dataset...")
     # Load the full dataset
-    dataset = CSIDataset("dataset.csv")
+    dataset = CSIDataset("dataset.csv", load_preprocessor('pose_detection_model.pth'))
     
     # Use 20% of data for testing
     test_size = int(0.2 * len(dataset))
@@ -109,7 +121,7 @@ def validate_model():
         print(f"Number of samples with human present: {len(pose_true_filtered)}")
         
         # Print detailed classification report
-        pose_names = ['Stand', 'Sit', 'Kneel', 'Sleep']
+        pose_names = POSE_NAMES
         print("\nDetailed Pose Classification Report:")
         print(classification_report(
             pose_true_filtered, 
@@ -131,5 +143,225 @@ def validate_model():
     else:
         print("\nNo samples with humans present found in the test set")
 
+def per_class_metrics(cm):
+    # Precision, recall and F1 for every class of a [K, K] (true, predicted)
+    # confusion matrix in one pass
+    cm = cm.double()
+    tp = cm.diag()
+    precision = tp / cm.sum(dim=0).clamp(min=1)
+    recall = tp / cm.sum(dim=1).clamp(min=1)
+    f1 = 2 * precision * recall / (precision + recall).clamp(min=1e-12)
+    return precision, recall, f1
+
+def validation_batches(dataset_path, seq_len, preprocessor=None):
+    # The held-out split train_model uses, as in-memory tensors: seeded
+    # random rows, or the time-ordered tail of windows
+    torch.manual_seed(42)
+    if seq_len is None:
+        dataset = CSIDataset(dataset_path, preprocessor)
+        train_size = int(0.8 * len(dataset))
+        _, val_dataset = torch.utils.data.random_split(dataset, [train_size, len(dataset) - train_size])
+    else:
+        dataset = load_windowed_dataset(dataset_path, seq_len, preprocessor=preprocessor)
+        train_size = int(0.8 * len(dataset))
+        val_dataset = torch.utils.data.Subset(dataset, range(train_size + seq_len, len(dataset)))
+    return TensorBatches(dataset_tensors(dataset), val_dataset.indices, torch.device('cpu'), seq_len)
+
+def confusion_matrices(model, batches, batch_size):
+    # Presence [2, 2] and pose [K, K] (true, predicted) confusion matrices,
+    # accumulated in preallocated tensors with bincount
+    num_classes = len(POSE_NAMES)
+    presence_cm = torch.zeros(2, 2, dtype=torch.long)
+    pose_cm = torch.zeros(num_classes, num_classes, dtype=torch.long)
+    with torch.inference_mode():
+        for csi, presence, pose in batches.batches(batch_size):
+            # Single rows are scored as length-1 sequences, as in training
+            presence_pred, pose_pred = model(as_sequences(csi))
+            presence_true = presence.long()
+            presence_cm += torch.bincount(presence_true * 2 + (presence_pred > 0.5).long(),
+                                          minlength=4).view(2, 2)
+            # Pose is only scored where a human is present
+            present = presence_true == 1
+            pose_cm += torch.bincount(pose[present] * num_classes + pose_pred[present].argmax(dim=1),
+                                      minlength=num_classes * num_classes).view(num_classes, num_classes)
+    return presence_cm, pose_cm
+
+def accuracies(presence_cm, pose_cm):
+    # Presence accuracy over all samples, pose accuracy where a human is present
+    return (100 * presence_cm.diag().sum().item() / max(int(presence_cm.sum()), 1),
+            100 * pose_cm.diag().sum().item() / max(int(pose_cm.sum()), 1))
+
+def fast_validate(model_path='pose_detection_model.pth', dataset_path='dataset.csv', seq_len=None,
+                  batch_size=4096):
+    # Validation on the held-out split train_model uses, in large batches.
+    # All metrics are derived from the confusion matrices. Returns a
+    # JSON-ready dict
+    start = time.perf_counter()
+    model = model_from_state_dict(load_state_dict(model_path))
+    # The preprocessing the model was trained with, if any
+    batches = validation_batches(dataset_path, seq_len, load_preprocessor(model_path))
+    load_seconds = time.perf_counter() - start
+    
+    eval_start = time.perf_counter()
+    presence_cm, pose_cm = confusion_matrices(model, batches, batch_size)
+    eval_seconds = time.perf_counter() - eval_start
+    
+    samples = int(presence_cm.sum())
+    present_samples = int(pose_cm.sum())
+    presence_accuracy, pose_accuracy = accuracies(presence_cm, pose_cm)
+    precision, recall, f1 = per_class_metrics(pose_cm)
+    support = pose_cm.sum(dim=1)
+    return {
+        'model': model_path,
+        'dataset': dataset_path,
+        'seq_len': seq_len,
+        'samples': samples,
+        'presence': {
+            'accuracy': presence_accuracy,
+            'confusion_matrix': presence_cm.tolist()
+        },
+        'pose': {
+            'accuracy': pose_accuracy,
+            'samples': present_samples,
+            'confusion_matrix': pose_cm.tolist(),
+            'per_class': {name: {'precision': precision[i].item(), 'recall': recall[i].item(),
+                                 'f1': f1[i].item(), 'support': support[i].item()}
+                          for i, name in enumerate(POSE_NAMES)}
+        },
+        'load_seconds': load_seconds,
+        'eval_seconds': eval_seconds,
+        'samples_per_sec': samples / max(eval_seconds, 1e-9)
+    }
+
+def plot_confusion_matrices(report, prefix=''):
+    # Optional heatmaps for a fast_validate report; imported lazily because
+    # matplotlib and seaborn dominate start-up time
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    
+    for name, labels, title in (('presence', ['Absent', 'Present'], 'Human Presence Detection'),
+                                ('pose', POSE_NAMES, 'Pose Classification')):
+        plt.figure(figsize=(8, 6))
+        sns.heatmap(np.array(report[name]['confusion_matrix']), annot=True, fmt='d', cmap='Blues',
+                    xticklabels=labels, yticklabels=labels)
+        plt.title(f'Confusion Matrix - {title}')
+        plt.ylabel('True Label')
+        plt.xlabel('Predicted Label')
+        plt.savefig(f'{prefix}{name}_confusion_matrix.png')
+        plt.close()
+
+def measure_latency(model, batch_size=1, seq_len=50, runs=200, warmup=20):
+    # Median and p95 wall time of a single forward pass in milliseconds
+    x = torch.randn(batch_size, seq_len, 30)
+    timings = []
+    with torch.no_grad():
+        for i in range(warmup + runs):
+            start = time.perf_counter()
+            model(x)
+            if i >= warmup:
+                timings.append((time.perf_counter() - start) * 1000)
+    return np.percentile(timings, 50), np.percentile(timings, 95)
+
+def compare_quantized(model_path='pose_detection_model.pth', dataset_path='dataset.csv', seq_len=None,
+                      batch_size=4096):
+    # Accuracy and latency report for the fp32 model against its dynamic int8
+    # copy, scored like fast_validate on the same held-out split
+    print("Loading test dataset...")
+    try:
+        # Quantized kernels are CPU-only
+        fp32_model = model_from_state_dict(load_state_dict(model_path))
+    except FileNotFoundError:
+        print(f"Error: Model file '{model_path}' not found!")
+        return
+    int8_model = quantize_model(fp32_model)
+    batches = validation_batches(dataset_path, seq_len, load_preprocessor(model_path))
+    latency_len = seq_len or 50
+    
+    print(f"\n{'Model':<6} {'Size MB':>8} {'Presence %':>11} {'Pose %':>8} "
+          f"{f'p50 ms (1x{latency_len})':>14} {f'p95 ms (1x{latency_len})':>14} "
+          f"{f'p50 ms (64x{latency_len})':>15}")
+    for name, model in (('fp32', fp32_model), ('int8', int8_model)):
+        presence_accuracy, pose_accuracy = accuracies(*confusion_matrices(model, batches, batch_size))
+        p50, p95 = measure_latency(model, seq_len=latency_len)
+        batch_p50, _ = measure_latency(model, batch_size=64, seq_len=latency_len, runs=50)
+        print(f"{name:<6} {model_size_mb(model):>8.3f} {presence_accuracy:>11.2f} {pose_accuracy:>8.2f} "
+              f"{p50:>14.3f} {p95:>14.3f} {batch_p50:>15.3f}")
+
+def compare_student(teacher_path, student_path, dataset_path='dataset.csv', seq_len=50, batch_size=4096):
+    # Accuracy on the held-out split and per-window latency of a distilled
+    # student against its teacher. Returns a JSON-ready dict
+    report = {'dataset': dataset_path, 'seq_len': seq_len, 'models': {}}
+    for name, path in (('teacher', teacher_path), ('student', student_path)):
+        validation = fast_validate(path, dataset_path, seq_len, batch_size)
+        model = model_from_state_dict(load_state_dict(path))
+        p50, p95 = measure_latency(model, seq_len=seq_len)
+        batch_p50, _ = measure_latency(model, batch_size=64, seq_len=seq_len, runs=50)
+        report['models'][name] = {
+            'path': path,
+            'architecture': type(model).__name__,
+            'params': sum(p.numel() for p in model.parameters()),
+            'size_mb': model_size_mb(model),
+            'presence_accuracy': validation['presence']['accuracy'],
+            'pose_accuracy': validation['pose']['accuracy'],
+            'pose_macro_f1': float(np.mean([c['f1'] for c in validation['pose']['per_class'].values()])),
+            'p50_ms': p50,
+            'p95_ms': p95,
+            'batch64_ms_per_window': batch_p50 / 64
+        }
+    
+    teacher, student = report['models']['teacher'], report['models']['student']
+    report['speedup'] = teacher['p50_ms'] / student['p50_ms']
+    report['batch64_speedup'] = teacher['batch64_ms_per_window'] / student['batch64_ms_per_window']
+    report['pose_accuracy_drop'] = teacher['pose_accuracy'] - student['pose_accuracy']
+    
+    print(f"\n{'Model':<8} {'Architecture':<18} {'Params':>8} {'Presence %':>11} {'Pose %':>8} "
+          f"{'Macro F1':>9} {'p50 ms':>8} {'p95 ms':>8} {'ms/window (64)':>15}")
+    for name, m in report['models'].items():
+        print(f"{name:<8} {m['architecture']:<18} {m['params']:>8} {m['presence_accuracy']:>11.2f} "
+              f"{m['pose_accuracy']:>8.2f} {m['pose_macro_f1']:>9.3f} {m['p50_ms']:>8.3f} "
+              f"{m['p95_ms']:>8.3f} {m['batch64_ms_per_window']:>15.4f}")
+    print(f"Student is {report['speedup']:.1f}x faster per window "
+          f"({report['batch64_speedup']:.1f}x in batches of 64), "
+          f"pose accuracy {-report['pose_accuracy_drop']:+.2f} points")
+    return report
+
 if __name__ == "__main__":
-    validate_model()
+    parser = argparse.ArgumentParser(description="Validate the trained pose model")
+    parser.add_argument('--compare-int8', action='store_true',
+                        help="Compare accuracy and latency of fp32 against dynamic int8")
+    parser.add_argument('--compare-student', default=None, metavar='STUDENT',
+                        help="Compare a distilled student checkpoint against --model as teacher")
+    parser.add_argument('--fast', action='store_true',
+                        help="Batched validation with vectorized metrics and a JSON report")
+    parser.add_argument('--model', default='pose_detection_model.pth',
+                        help="State dict or train_model checkpoint (--fast, --compare-int8)")
+    parser.add_argument('--data', default='dataset.csv', help="CSV file or .npy dataset prefix")
+    parser.add_argument('--seq-len', type=int, default=None,
+                        help="Validate on windows of this many rows (--fast, --compare-int8; "
+                             "--compare-student defaults to 50)")
+    parser.add_argument('--batch-size', type=int, default=4096)
+    parser.add_argument('--output', default=None, help="Write the JSON report here instead of stdout")
+    parser.add_argument('--plots', action='store_true', help="Also save confusion matrix heatmaps (--fast)")
+    args = parser.parse_args()
+    
+    if args.fast:
+        report = fast_validate(args.model, args.data, args.seq_len, args.batch_size)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent=2)
+        else:
+            print(json.dumps(report, indent=2))
+        if args.plots:
+            plot_confusion_matrices(report)
+    elif args.compare_student:
+        report = compare_student(args.model, args.compare_student, args.data, args.seq_len or 50,
+                                 args.batch_size)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent=2)
+    elif args.compare_int8:
+        compare_quantized(args.model, args.data, args.seq_len, args.batch_size)
+    else:
+        validate_model()